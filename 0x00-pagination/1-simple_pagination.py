@@ -3,28 +3,14 @@
 Defines the Server class to paginate a dataset of popular baby names.
 """
 
-import csv
 import math
-from typing import List, Tuple
+import time
+from typing import List, Optional
 
-
-def index_range(page: int, page_size: int) -> Tuple[int, int]:
-    """
-    Calculates start and end indices for pagination based on the page number and page size.
-
-    Args:
-        page (int): The page number (1-indexed).
-        page_size (int): The number of items per page.
-
-    Returns:
-        Tuple[int, int]: A tuple containing the start and end indices.
-    """
-    start, end = 0, 0
-    for i in range(page):
-        start = end
-        end += page_size
-
-    return (start, end)
+from dataset_storage import load_dataset
+from lazy_loader import SingleFlight
+from metrics import MetricsRegistry, record_page, timed
+from page_planner import index_range, plan_page
 
 
 class Server:
@@ -33,24 +19,59 @@ class Server:
     """
     DATA_FILE = "Popular_Baby_Names.csv"
 
-    def __init__(self):
+    def __init__(self, storage: str = "list", warm_up: bool = False,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            storage (str): Backing store for the dataset, one of
+                `dataset_storage.STORAGES`, e.g. "list" to read every row
+                into memory, "mmap" to parse rows from a memory-mapped
+                file on access, "columnar" for compact typed columns,
+                "snapshot" for columns loaded from a pre-parsed binary
+                snapshot, "shared" to attach to a dataset published in
+                shared memory, "parallel" to parse with a process pool or
+                "blocks" to read a block-compressed file lazily.
+            warm_up (bool): Start loading the dataset in a background
+                thread right away.
+            metrics: Optional sink such as `metrics.MetricsRegistry` for
+                load and request timings; None disables instrumentation.
+        """
         self.__dataset = None
+        self.__storage = storage
+        self.metrics = metrics
+        self.__loader = SingleFlight(lambda: timed(
+            self.metrics, "load_seconds",
+            lambda: load_dataset(self.DATA_FILE, self.__storage),
+            server="simple", stage="dataset"))
+        if warm_up:
+            self.__loader.start()
 
     def dataset(self) -> List[List]:
         """
         Loads and caches the dataset from a CSV file if not already loaded.
+        Concurrent first calls share a single load.
 
         Returns:
             List[List]: The loaded dataset excluding the header row.
         """
         if self.__dataset is None:
-            with open(self.DATA_FILE) as f:
-                reader = csv.reader(f)
-                dataset = [row for row in reader]
-            self.__dataset = dataset[1:]  # Exclude header row
+            self.__dataset = self.__loader.get()
 
         return self.__dataset
 
+    def is_ready(self) -> bool:
+        """
+        Readiness probe: tells whether the dataset has been loaded.
+        """
+        return self.__loader.is_ready()
+
+    async def ready(self) -> None:
+        """
+        Awaits the dataset without blocking the event loop, e.g. to hold
+        traffic until a worker has warmed up.
+        """
+        await self.__loader.ready()
+
     def get_page(self, page: int = 1, page_size: int = 10) -> List[List]:
         """
         Retrieves a specific page of the dataset.
@@ -68,6 +89,16 @@ class Server:
         assert isinstance(
             page_size, int) and page_size > 0, "Page size must be a positive integer."
 
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+
         dataset = self.dataset()
-        start, end = index_range(page, page_size)
-        return dataset[start:end] if start < len(dataset) else []
+        # Clamped to the dataset, so pages past the end come back empty
+        # however large the page number.
+        start, end = plan_page(page, page_size, len(dataset))
+        data = dataset[start:end] if start < end else []
+
+        if metrics is not None:
+            record_page(metrics, "get_page", started, len(data))
+        return data
@@ -1,8 +1,20 @@
 #!/usr/bin/env python3
 
-import csv
-from typing import List
-index_range = __import__('0-simple_helper_function').index_range
+import json
+import math
+import time
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from aggregates import AggregateViews, hyper_page
+from count_cache import CountCache
+from dataset_storage import load_dataset, source_size, writable_dataset
+from ingest import FileTail
+from lazy_loader import SingleFlight
+from live_index import IndexedDataset, live_index_for
+from metrics import MetricsRegistry, record_page, timed
+from page_cache import PageCache
+from page_planner import index_range, plan_page
+from secondary_index import SecondaryIndexes, matches, normalize_filters
 
 
 class Server:
@@ -11,10 +23,48 @@ class Server:
     """
     DATA_FILE = "Popular_Baby_Names.csv"
 
-    def __init__(self):
+    def __init__(self, storage: str = "list", warm_up: bool = False,
+                 page_cache: Optional[PageCache] = None,
+                 metrics: Optional[MetricsRegistry] = None,
+                 json_cache: bool = False):
         # Initializes the Server instance and sets dataset to None for lazy
-        # loading.
+        # loading. `storage` selects the backing store (one of
+        # `dataset_storage.STORAGES`); `warm_up` starts loading in
+        # a background thread right away; `page_cache` caches `get_hyper`
+        # responses; `metrics` records load and request timings (see
+        # `metrics.py`) unless None; `json_cache` keeps each row's JSON
+        # encoding for `get_hyper_json` once it has been served.
         self.__dataset = None
+        self.__storage = storage
+        self.metrics = metrics
+        # Read-only stores are wrapped so `add_row` and `refresh` can
+        # append to them.
+        self.__loader = SingleFlight(lambda: timed(
+            self.metrics, "load_seconds",
+            lambda: writable_dataset(load_dataset(self.DATA_FILE,
+                                                  self.__storage)),
+            server="hypermedia", stage="dataset"))
+        self.__indexes = SingleFlight(lambda: timed(
+            self.metrics, "load_seconds",
+            lambda: SecondaryIndexes(self.dataset(), self.__live),
+            server="hypermedia", stage="indexes"))
+        self.__aggregates = SingleFlight(lambda: timed(
+            self.metrics, "load_seconds",
+            lambda: AggregateViews(self.dataset(), self.__live),
+            server="hypermedia", stage="aggregates"))
+        self.__indexed = SingleFlight(lambda: timed(
+            self.metrics, "load_seconds", self.__build_indexed,
+            server="hypermedia", stage="indexed"))
+        self.__counts = None
+        # Created on the first deletion; None means every row is live.
+        self.__live = None
+        self.__tail = None
+        self.page_cache = page_cache
+        # Row id to the row's JSON bytes, or None when disabled.
+        self.__row_json: Optional[Dict[int, bytes]] = \
+            {} if json_cache else None
+        if warm_up:
+            self.__loader.start()
 
     def dataset(self) -> List[List]:
         """
@@ -24,14 +74,200 @@ class Server:
             List[List]: A list of records from the dataset, excluding the header.
         """
         # Check if the dataset is already loaded; load it from the file if not.
+        # Concurrent first calls share a single load.
         if self.__dataset is None:
-            with open(self.DATA_FILE) as f:
-                reader = csv.reader(f)
-                dataset = [row for row in reader]
-            self.__dataset = dataset[1:]  # Skip the header row
+            self.__dataset = self.__loader.get()
 
         return self.__dataset
 
+    def is_ready(self) -> bool:
+        """
+        Readiness probe: tells whether the dataset has been loaded.
+        """
+        return self.__loader.is_ready()
+
+    async def ready(self) -> None:
+        """
+        Awaits the dataset without blocking the event loop, e.g. to hold
+        traffic until a worker has warmed up.
+        """
+        await self.__loader.ready()
+
+    def indexes(self) -> SecondaryIndexes:
+        """
+        Builds and caches the secondary indexes used for filtered and
+        sorted pages.
+
+        Returns:
+            SecondaryIndexes: Posting lists, name prefixes and sort orders.
+        """
+        return self.__indexes.get()
+
+    def aggregates(self) -> AggregateViews:
+        """
+        Builds and caches the materialized name totals used by
+        `get_top_names` and `get_popularity`.
+        """
+        return self.__aggregates.get()
+
+    def indexed_dataset(self) -> IndexedDataset:
+        """
+        Returns a position-indexed view of this server's rows, sharing
+        the dataset and the live index, so rows added or deleted through
+        `add_row`, `refresh` and `delete_row` show up in it. Change rows
+        through those methods only, not through the view. Concurrent
+        first calls share a single build.
+        """
+        return self.__indexed.get()
+
+    def is_indexed(self) -> bool:
+        """
+        Tells whether `indexed_dataset()` has been built, i.e. whether it
+        returns without loading or indexing anything.
+        """
+        return self.__indexed.is_ready()
+
+    def __build_indexed(self) -> IndexedDataset:
+        dataset = self.dataset()
+        if self.__live is None:
+            self.__live = live_index_for(dataset)
+        return IndexedDataset(dataset, self.__live)
+
+    def counts(self) -> CountCache:
+        """
+        Returns the cache of row counts per filter predicate.
+        """
+        if self.__counts is None:
+            self.__counts = CountCache(self.indexes())
+        return self.__counts
+
+    def row_count(self, filters: Optional[Dict] = None,
+                  estimate: bool = False) -> int:
+        """
+        Counts the live rows matching `filters` without scanning them.
+
+        Args:
+            filters (Dict): Optional column filters, see `get_page`.
+            estimate (bool): Allow an estimate for uncached predicates.
+
+        Returns:
+            int: The (possibly estimated) number of matching rows.
+        """
+        if not filters:
+            if self.__live is not None:
+                return self.__live.live_count
+            return len(self.dataset())
+        if estimate:
+            return self.counts().estimate(filters)
+        return self.counts().count(filters)
+
+    def __view_size(self, filters: Optional[Dict],
+                    sort: Optional[str]) -> int:
+        """
+        Counts the rows of a (filtered) view exactly. Filtered and sorted
+        views are materialized to find their pages anyway, so their size
+        comes for free.
+        """
+        row_ids = self.matching_rows(filters, sort)
+        if row_ids is not None:
+            return len(row_ids)
+        return self.row_count()
+
+    def __invalidate_pages(self, row: List) -> None:
+        """
+        Drops the cached pages a change to `row` can affect: every
+        unfiltered page, whose positions and totals shift, and the pages of
+        filters the row matches.
+        """
+        if self.page_cache is not None:
+            self.page_cache.invalidate(
+                lambda key: not key[2] or bool(row) and matches(row, key[2]))
+
+    def add_row(self, row: List) -> int:
+        """
+        Appends a row to the dataset and updates indexes and counts.
+        Read-only stores keep added rows beside the loaded ones.
+
+        Returns:
+            int: The row id of the new row.
+        """
+        assert row, "Row must not be empty."
+        return self.__append(row)
+
+    def __append(self, row: List) -> int:
+        dataset = self.dataset()
+        dataset.append(row)
+        row_id = len(dataset) - 1
+        if self.__live is not None:
+            self.__live.append()
+        # Blank lines take a position but are not indexed, as at load.
+        if row:
+            if self.__indexes.is_ready():
+                self.indexes().add(row_id, row)
+            if self.__aggregates.is_ready():
+                self.aggregates().add(row)
+            if self.__counts is not None:
+                self.__counts.add(row)
+        self.__invalidate_pages(row)
+        return row_id
+
+    def refresh(self) -> int:
+        """
+        Ingests rows appended to DATA_FILE since the last load or refresh.
+
+        Only the new bytes are read and parsed; the rows are added like
+        `add_row`, so indexes and counts are updated in place and readers
+        keep serving pages meanwhile. Blank lines get a position, as they
+        do at load.
+
+        Returns:
+            int: The number of rows ingested.
+        """
+        if self.__tail is None:
+            self.__tail = FileTail(self.DATA_FILE,
+                                   source_size(self.dataset()))
+        rows = self.__tail.read_rows()
+        for row in rows:
+            self.__append(row)
+        return len(rows)
+
+    def delete_row(self, row_id: int) -> None:
+        """
+        Deletes a row; later rows move up one place in unfiltered pages.
+
+        Args:
+            row_id (int): The row id (position in the file) to delete.
+        """
+        dataset = self.dataset()
+        if self.__live is None:
+            self.__live = live_index_for(dataset)
+        deleted = self.__live.delete(row_id)
+        assert deleted, "Row does not exist."
+        if self.__row_json is not None:
+            self.__row_json.pop(row_id, None)
+        row = dataset[row_id]
+        if row:
+            if self.__indexes.is_ready():
+                self.indexes().remove(row_id, row)
+            if self.__aggregates.is_ready():
+                self.aggregates().remove(row)
+            if self.__counts is not None:
+                self.__counts.remove(row)
+        self.__invalidate_pages(row)
+
+    def matching_rows(self, filters: Optional[Dict] = None,
+                      sort: Optional[str] = None) -> Optional[Sequence[int]]:
+        """
+        Finds the row ids of a filtered or sorted view of the dataset.
+
+        Returns:
+            Optional[Sequence[int]]: The row ids in page order, or None for
+            the unfiltered dataset in file order.
+        """
+        if not filters and not sort:
+            return None
+        return self.indexes().query(filters, sort)
+
     @staticmethod
     def assert_positive_integer_type(value: int) -> None:
         """
@@ -47,13 +283,19 @@ class Server:
         assert isinstance(
             value, int) and value > 0, "Value must be a positive integer."
 
-    def get_page(self, page: int = 1, page_size: int = 10) -> List[List]:
+    def get_page(self, page: int = 1, page_size: int = 10,
+                 filters: Optional[Dict] = None,
+                 sort: Optional[str] = None) -> List[List]:
         """
         Retrieves a page of data from the dataset based on page number and page size.
 
         Args:
             page (int): The page number, must be a positive integer.
             page_size (int): The number of items per page, must be a positive integer.
+            filters (Dict): Optional column filters, e.g. {"year": 2016,
+                "gender": "FEMALE", "name_prefix": "ol"}.
+            sort (str): Optional sort column, "count" or "rank", prefixed
+                with "-" for descending order.
 
         Returns:
             List[List]: A list of records for the specified page, or an empty list if out of range.
@@ -62,9 +304,39 @@ class Server:
         self.assert_positive_integer_type(page)
         self.assert_positive_integer_type(page_size)
 
-        # Get start and end indices for the desired page.
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+
+        # Get start and end indices for the desired page, clamped to the
+        # dataset (no view is longer), so pages past the end come back
+        # empty however large the page number.
+        start, end = plan_page(page, page_size, len(self.dataset()))
+        data = self.get_rows(start, end, filters, sort)
+
+        if metrics is not None:
+            record_page(metrics, "get_page", started, len(data))
+        return data
+
+    def get_rows(self, start: int, end: int,
+                 filters: Optional[Dict] = None,
+                 sort: Optional[str] = None) -> List[List]:
+        """
+        Retrieves the rows between two offsets of a (filtered) view.
+
+        Args:
+            start (int): Offset of the first row, 0-based.
+            end (int): Offset just past the last row.
+            filters (Dict): Optional column filters, see `get_page`.
+            sort (str): Optional sort column, see `get_page`.
+
+        Returns:
+            List[List]: The rows, fewer than requested past the end.
+        """
         dataset = self.dataset()
-        start, end = index_range(page, page_size)
+        row_ids = self.__row_ids(start, end, filters, sort)
+        if row_ids is not None:
+            return [dataset[i] for i in row_ids]
 
         # Retrieve data slice; handle IndexError by returning an empty list if
         # out of range.
@@ -74,7 +346,79 @@ class Server:
             data = []
         return data
 
-    def get_hyper(self, page: int = 1, page_size: int = 10) -> dict:
+    def __row_ids(self, start: int, end: int, filters: Optional[Dict],
+                  sort: Optional[str]) -> Optional[Sequence[int]]:
+        """
+        Finds the row ids between two offsets of a (filtered) view.
+
+        Returns:
+            Optional[Sequence[int]]: The row ids, or None when the view is
+            the whole dataset without deletions, i.e. ids equal offsets.
+        """
+        # Filtered and sorted views page through precomputed row ids.
+        row_ids = self.matching_rows(filters, sort)
+        if row_ids is not None:
+            return row_ids[start:end]
+
+        # Skip deleted rows through the live index, if any were deleted.
+        live = self.__live
+        if live is not None and live.live_count < len(live):
+            row_ids = []
+            for k in range(start, end):
+                row_id = live.select(k)
+                if row_id is None:
+                    break
+                row_ids.append(row_id)
+            return row_ids
+        return None
+
+    def iter_pages(self, page_size: int = 1000, offset: int = 0,
+                   filters: Optional[Dict] = None,
+                   sort: Optional[str] = None) -> Iterator[List[List]]:
+        """
+        Streams a (filtered) view in consecutive chunks, holding only one
+        chunk in memory at a time.
+
+        Args:
+            page_size (int): The number of rows per chunk.
+            offset (int): Offset of the first row, to resume an export.
+            filters (Dict): Optional column filters, see `get_page`.
+            sort (str): Optional sort column, see `get_page`.
+
+        Yields:
+            List[List]: Non-empty chunks of rows.
+        """
+        self.assert_positive_integer_type(page_size)
+        assert isinstance(offset, int) and offset >= 0, \
+            "Offset must be a non-negative integer."
+        while True:
+            data = self.get_rows(offset, offset + page_size, filters, sort)
+            if not data:
+                return
+            yield data
+            offset += len(data)
+
+    def iter_rows(self, offset: int = 0, filters: Optional[Dict] = None,
+                  sort: Optional[str] = None,
+                  chunk_size: int = 1000) -> Iterator[List]:
+        """
+        Streams the rows of a (filtered) view one at a time.
+
+        Args:
+            offset (int): Offset of the first row, to resume an export.
+            filters (Dict): Optional column filters, see `get_page`.
+            sort (str): Optional sort column, see `get_page`.
+            chunk_size (int): Rows fetched from the store at a time.
+
+        Yields:
+            List: Each row in view order.
+        """
+        for data in self.iter_pages(chunk_size, offset, filters, sort):
+            yield from data
+
+    def get_hyper(self, page: int = 1, page_size: int = 10,
+                  filters: Optional[Dict] = None,
+                  sort: Optional[str] = None) -> dict:
         """
         Provides paginated data with hypermedia-style metadata, such as page number, total pages,
         previous and next page numbers.
@@ -82,15 +426,38 @@ class Server:
         Args:
             page (int): The page number, must be a positive integer.
             page_size (int): The number of items per page, must be a positive integer.
+            filters (Dict): Optional column filters, see `get_page`.
+            sort (str): Optional sort column, see `get_page`.
 
         Returns:
             dict: A dictionary containing paginated data and additional metadata.
         """
-        # Calculate the total number of pages.
-        total_pages = len(self.dataset()) // page_size + 1
+        self.assert_positive_integer_type(page)
+        self.assert_positive_integer_type(page_size)
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
 
-        # Get the data for the requested page.
-        data = self.get_page(page, page_size)
+        # Serve repeated requests from the page cache, if configured.
+        key = (page, page_size, normalize_filters(filters), sort)
+        if self.page_cache is not None:
+            info = self.page_cache.get(key)
+            if metrics is not None:
+                metrics.increment("page_cache_requests_total",
+                                  result="miss" if info is None else "hit")
+            if info is not None:
+                if metrics is not None:
+                    record_page(metrics, "get_hyper", started,
+                                len(info["data"]))
+                return info
+
+        # Get the data for the requested page, directly rather than
+        # through get_page, whose metrics would count it as a get_page.
+        start, end = plan_page(page, page_size, len(self.dataset()))
+        data = self.get_rows(start, end, filters, sort)
+
+        # Calculate the total number of pages from the size of the view.
+        total_pages = math.ceil(self.__view_size(filters, sort) / page_size)
 
         # Build metadata including page size, total pages, data, previous and
         # next pages.
@@ -102,4 +469,102 @@ class Server:
             "prev_page": page - 1 if page > 1 else None,
             "next_page": page + 1 if page + 1 <= total_pages else None
         }
+        if self.page_cache is not None:
+            self.page_cache.put(key, info)
+        if metrics is not None:
+            record_page(metrics, "get_hyper", started, len(data))
         return info
+
+    def get_top_names(self, page: int = 1, page_size: int = 10,
+                      year: Optional[str] = None,
+                      gender: Optional[str] = None,
+                      ethnicity: Optional[str] = None) -> Dict:
+        """
+        Pages through names ranked by their total count within a group,
+        with the same metadata as `get_hyper`.
+
+        Args:
+            page (int): The page number, must be a positive integer.
+            page_size (int): The number of names per page, must be a
+                positive integer.
+            year (str): Optional year of the group, e.g. "2016".
+            gender (str): Optional gender of the group.
+            ethnicity (str): Optional ethnicity of the group. Omitted
+                columns are aggregated over, so passing only `year` ranks
+                names per year.
+
+        Returns:
+            Dict: Pagination metadata with [name, total] pairs as data.
+        """
+        self.assert_positive_integer_type(page)
+        self.assert_positive_integer_type(page_size)
+        ranking = self.aggregates().top_names(year, gender, ethnicity)
+        return hyper_page(ranking, page, page_size)
+
+    def get_popularity(self, name: str, page: int = 1,
+                       page_size: int = 10) -> Dict:
+        """
+        Pages through a name's total count per year, oldest year first,
+        with the same metadata as `get_hyper`.
+
+        Returns:
+            Dict: Pagination metadata with [year, total] pairs as data.
+        """
+        self.assert_positive_integer_type(page)
+        self.assert_positive_integer_type(page_size)
+        years = self.aggregates().popularity(name)
+        return hyper_page(years, page, page_size)
+
+    def __encoded_row(self, dataset: Sequence, row_id: int) -> bytes:
+        # Returns the row's JSON bytes, cached when `json_cache` is on.
+        cache = self.__row_json
+        if cache is None:
+            return json.dumps(dataset[row_id]).encode()
+        encoded = cache.get(row_id)
+        if encoded is None:
+            encoded = cache[row_id] = json.dumps(dataset[row_id]).encode()
+        return encoded
+
+    def get_hyper_json(self, page: int = 1, page_size: int = 10,
+                       filters: Optional[Dict] = None,
+                       sort: Optional[str] = None) -> bytes:
+        """
+        Serializes a `get_hyper` response, byte for byte equal to
+        `json.dumps(self.get_hyper(...)).encode()`.
+
+        The body is joined from per-row JSON fragments, which are kept
+        between requests when the server was created with `json_cache`.
+
+        Returns:
+            bytes: The UTF-8 (in fact ASCII) JSON body.
+        """
+        self.assert_positive_integer_type(page)
+        self.assert_positive_integer_type(page_size)
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+
+        dataset = self.dataset()
+        start, end = plan_page(page, page_size, len(dataset))
+        row_ids = self.__row_ids(start, end, filters, sort)
+        if row_ids is None:
+            row_ids = range(start, min(end, len(dataset)))
+        rows = [self.__encoded_row(dataset, i) for i in row_ids]
+        total_pages = math.ceil(self.__view_size(filters, sort) / page_size)
+
+        # Same keys, order and separators as json.dumps(get_hyper(...)).
+        body = b"".join((
+            b'{"page": ', json.dumps(page).encode(),
+            b', "page_size": ', json.dumps(
+                page_size if page_size <= len(rows) else len(rows)).encode(),
+            b', "total_pages": ', json.dumps(total_pages).encode(),
+            b', "data": [', b", ".join(rows),
+            b'], "prev_page": ', json.dumps(
+                page - 1 if page > 1 else None).encode(),
+            b', "next_page": ', json.dumps(
+                page + 1 if page + 1 <= total_pages else None).encode(),
+            b"}",
+        ))
+        if metrics is not None:
+            record_page(metrics, "get_hyper_json", started, len(rows))
+        return body
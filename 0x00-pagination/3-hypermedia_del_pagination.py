@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 
-import csv
 import math
-from typing import List, Dict
+import time
+from typing import Dict, Iterator, List, Optional
+
+from cursor import DatasetVersion, decode_cursor, default_secret, \
+    encode_cursor
+from dataset_storage import load_dataset, source_size
+from ingest import FileTail
+from lazy_loader import SingleFlight
+from live_index import IndexedDataset
+from metrics import MetricsRegistry, record_page, timed
 
 
 class Server:
@@ -11,11 +19,29 @@ class Server:
     """
     DATA_FILE = "Popular_Baby_Names.csv"
 
-    def __init__(self):
+    def __init__(self, storage: str = "list", warm_up: bool = False,
+                 metrics: Optional[MetricsRegistry] = None):
         # Initializes the Server instance with placeholders for the full dataset
         # and an indexed dataset to facilitate deletion-resilient pagination.
+        # `storage` selects the backing store (one of
+        # `dataset_storage.STORAGES`); `warm_up` starts building
+        # the indexed dataset in a background thread right away; `metrics`
+        # records load and request timings (see `metrics.py`) unless None.
         self.__dataset = None
         self.__indexed_dataset = None
+        self.__version = None
+        self.__storage = storage
+        self.metrics = metrics
+        self.__loader = SingleFlight(lambda: timed(
+            self.metrics, "load_seconds", self.__load,
+            server="deletion", stage="dataset"))
+        self.__indexed_loader = SingleFlight(lambda: timed(
+            self.metrics, "load_seconds",
+            lambda: IndexedDataset(self.dataset()),
+            server="deletion", stage="indexed"))
+        self.__tail = None
+        if warm_up:
+            self.__indexed_loader.start()
 
     def dataset(self) -> List[List]:
         """
@@ -25,77 +51,211 @@ class Server:
             List[List]: The full dataset, excluding the header row.
         """
         # Load and cache the dataset from the file if not already loaded.
+        # Concurrent first calls share a single load.
         if self.__dataset is None:
-            with open(self.DATA_FILE) as f:
-                reader = csv.reader(f)
-                dataset = [row for row in reader]
-            self.__dataset = dataset[1:]  # Skip the header row
+            self.__dataset = self.__loader.get()
 
         return self.__dataset
 
-    def indexed_dataset(self) -> Dict[int, List]:
+    def __load(self) -> List[List]:
+        # The version is read first, so it never names newer contents
+        # than were loaded.
+        version = DatasetVersion(self.DATA_FILE)
+        dataset = load_dataset(self.DATA_FILE, self.__storage)
+        self.__version = version
+        return dataset
+
+    def version(self) -> DatasetVersion:
+        """
+        Returns the version of DATA_FILE that was loaded, which cursors
+        are issued for. Appends and `refresh()` keep it.
+        """
+        self.dataset()
+        return self.__version
+
+    def is_ready(self) -> bool:
+        """
+        Readiness probe: tells whether the indexed dataset has been loaded.
+        """
+        return self.__indexed_loader.is_ready()
+
+    async def ready(self) -> None:
+        """
+        Awaits the indexed dataset without blocking the event loop, e.g. to
+        hold traffic until a worker has warmed up.
+        """
+        await self.__indexed_loader.ready()
+
+    def indexed_dataset(self) -> IndexedDataset:
         """
-        Caches the first 1000 rows of the dataset as a dictionary with integer indices
-        as keys to create an indexed, deletion-resilient dataset.
+        Caches a deletion-resilient, position-indexed view of the dataset.
+
+        The view behaves like a dict of position to row, but is backed by
+        the dataset and an order-statistic index of live rows rather than a
+        copy of every row, so deleting a key is O(log n).
 
         Returns:
-            Dict[int, List]: A dictionary where each key is an index and each value
-                             is a dataset row, up to 1000 rows.
+            IndexedDataset: A mapping where each key is a stable row position
+                            and each value is a dataset row.
         """
-        # Load and cache an indexed version of the dataset if it hasn't been
-        # created.
+        # Build and cache the indexed view if it hasn't been created.
         if self.__indexed_dataset is None:
-            dataset = self.dataset()
-            truncated_dataset = dataset[:1000]  # Limit to the first 1000 rows
-            self.__indexed_dataset = {
-                i: dataset[i] for i in range(len(dataset))
-            }
+            self.__indexed_dataset = self.__indexed_loader.get()
         return self.__indexed_dataset
 
+    def refresh(self) -> int:
+        """
+        Ingests rows appended to DATA_FILE since the last load or refresh.
+
+        Only the new bytes are read and parsed. The rows get the next
+        stable positions in the indexed dataset and readers are never
+        blocked. Appending keeps the dataset version, so existing indices
+        and cursors stay valid. Read-only stores such as "shared" keep
+        the new rows beside the dataset instead of inside it.
+
+        Returns:
+            int: The number of rows ingested.
+        """
+        dataset = self.indexed_dataset()
+        assert self.version().accepts(DatasetVersion(self.DATA_FILE).token), \
+            "DATA_FILE was replaced or rewritten; load it with a new Server."
+        if self.__tail is None:
+            self.__tail = FileTail(self.DATA_FILE,
+                                   source_size(self.dataset()))
+        rows = self.__tail.read_rows()
+        dataset.extend(rows)
+        return len(rows)
+
     def get_hyper_index(self, index: int = None, page_size: int = 10) -> Dict:
         """
         Provides a deletion-resilient paginated response starting from a specific index
         with a specified page size.
 
         Args:
-            index (int): The starting index for pagination.
+            index (int): The starting index for pagination, 0 if omitted.
             page_size (int): The number of items per page.
 
         Returns:
             Dict: A dictionary with pagination details including data,
                   starting index, page size, and the next index.
         """
-        # Retrieve the indexed dataset and validate that the index is within
-        # bounds.
-        dataset = self.indexed_dataset()
-        data_length = len(dataset)
-        assert 0 <= index < data_length, "Index out of range."
-
-        # Initialize the response dictionary and prepare to collect the
-        # paginated data.
-        response = {}
-        data = []
-        response['index'] = index  # Record the starting index
-
-        # Collect `page_size` elements, accounting for any deleted indices.
-        for i in range(page_size):
-            while True:
-                curr = dataset.get(index)
-                index += 1
-                # Continue to the next index if the current one is missing.
-                if curr is not None:
-                    break
-            data.append(curr)
-
-        # Populate the response dictionary with the collected data and
-        # metadata.
-        response['data'] = data
-        response['page_size'] = len(data)
-
-        # Determine the next index, if it exists; otherwise set to None.
-        if dataset.get(index):
-            response['next_index'] = index
-        else:
-            response['next_index'] = None
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
 
+        # The indexed dataset validates the index and skips deleted rows.
+        response, end = self.indexed_dataset().hyper_index(index, page_size)
+        if metrics is not None:
+            record_page(metrics, "get_hyper_index", started,
+                        len(response['data']), end - response['index'])
         return response
+
+    def get_page_by_cursor(self, cursor: str = None,
+                           page_size: int = 10) -> Dict:
+        """
+        Provides a deletion-resilient page addressed by an opaque cursor
+        instead of a raw index.
+
+        Cursors are signed with PAGINATION_CURSOR_SECRET and carry the
+        dataset version, so a cursor issued by one worker can be resumed
+        by any other worker serving the same file.
+
+        Args:
+            cursor (str): A `next_cursor` from an earlier response, or None
+                          for the first page.
+            page_size (int): The number of items per page.
+
+        Returns:
+            Dict: A dictionary with the cursor, page size, data, and the
+                  cursor of the next page (None after the last page).
+
+        Raises:
+            CursorError: If the cursor is malformed, forged, or was issued
+                         for another version of the dataset.
+        """
+        assert isinstance(page_size, int) and page_size > 0, \
+            "Page size must be a positive integer."
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        dataset = self.indexed_dataset()
+        version = self.version()
+        secret = default_secret()
+
+        # Resume at the encoded position; deleted rows are skipped by the
+        # live index.
+        position = 0
+        if cursor is not None:
+            position = decode_cursor(cursor, version, secret)
+        data, end = dataset.page(position, page_size)
+
+        next_cursor = None
+        if dataset.live.next_live(end) is not None:
+            next_cursor = encode_cursor(end, version, secret)
+        if metrics is not None:
+            record_page(metrics, "get_page_by_cursor", started, len(data),
+                        end - position)
+        return {
+            'cursor': cursor,
+            'page_size': len(data),
+            'data': data,
+            'next_cursor': next_cursor,
+        }
+
+    def cursor_for(self, position: int) -> str:
+        """
+        Signs a cursor that resumes at a stable row position, e.g. the
+        `next_index` of a page from `iter_pages`.
+        """
+        assert isinstance(position, int) and position >= 0, \
+            "Position must be a non-negative integer."
+        return encode_cursor(position, self.version(), default_secret())
+
+    def iter_pages(self, cursor: str = None,
+                   page_size: int = 1000) -> Iterator[Dict]:
+        """
+        Streams the live rows as consecutive pages, holding only one page
+        in memory at a time. The cursor is verified once and the pages
+        are walked by position; pass a page's `next_index` to
+        `cursor_for` to resume an interrupted export later, on any
+        worker.
+
+        Args:
+            cursor (str): Cursor to resume from, or None to start over.
+            page_size (int): The number of rows per page.
+
+        Yields:
+            Dict: Non-empty pages shaped like `get_hyper_index` responses.
+
+        Raises:
+            CursorError: If the cursor is not valid for this dataset.
+        """
+        assert isinstance(page_size, int) and page_size > 0, \
+            "Page size must be a positive integer."
+        dataset = self.indexed_dataset()
+        position = 0
+        if cursor is not None:
+            position = decode_cursor(cursor, self.version(),
+                                     default_secret())
+        while True:
+            data, end = dataset.page(position, page_size)
+            next_index = end if dataset.live.next_live(end) is not None \
+                else None
+            if data:
+                yield {
+                    'index': position,
+                    'data': data,
+                    'page_size': len(data),
+                    'next_index': next_index,
+                }
+            if next_index is None:
+                return
+            position = next_index
+
+    def iter_rows(self, cursor: str = None,
+                  chunk_size: int = 1000) -> Iterator[List]:
+        """
+        Streams the live rows one at a time, starting at `cursor`.
+        """
+        for response in self.iter_pages(cursor, chunk_size):
+            yield from response['data']
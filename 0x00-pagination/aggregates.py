@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Materialized group-by views of the dataset: name totals per
+year/gender/ethnicity group and per-name totals by year.
+"""
+import math
+import threading
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from live_index import LiveIndex
+from secondary_index import COLUMNS
+
+GROUP_COLUMNS = ("year", "gender", "ethnicity")
+# Every subset of GROUP_COLUMNS, so any combination of them is a lookup.
+GROUPINGS = tuple(grouping for size in range(len(GROUP_COLUMNS) + 1)
+                  for grouping in combinations(GROUP_COLUMNS, size))
+
+Group = Tuple[Tuple[str, str], ...]
+
+
+def group_key(grouping: Tuple[str, ...], row: List) -> Group:
+    """
+    Returns the (column, value) pairs identifying `row`'s group.
+    """
+    return tuple((column, row[COLUMNS[column]]) for column in grouping)
+
+
+def hyper_page(items: Sequence, page: int, page_size: int) -> Dict:
+    """
+    Pages through `items` with the same metadata as `Server.get_hyper`.
+    """
+    total_pages = math.ceil(len(items) / page_size)
+    data = [list(item) for item in
+            items[(page - 1) * page_size:page * page_size]]
+    return {
+        "page": page,
+        "page_size": page_size if page_size <= len(data) else len(data),
+        "total_pages": total_pages,
+        "data": data,
+        "prev_page": page - 1 if page > 1 else None,
+        "next_page": page + 1 if page + 1 <= total_pages else None,
+    }
+
+
+class AggregateViews:
+    """
+    Sums of the Count column by name, for every combination of year,
+    gender and ethnicity, and by year for every name.
+
+    Totals are built in one pass and adjusted in place through
+    `add`/`remove`. Each group's ranking is sorted when first read and
+    re-sorted only after that group changes.
+    """
+
+    def __init__(self, dataset: Sequence, live: Optional[LiveIndex] = None):
+        """
+        Args:
+            dataset (Sequence): The rows to aggregate.
+            live (LiveIndex): Rows that are not live in it are skipped.
+        """
+        # totals[grouping][group][name] and by_year[name][year] are sums
+        # of the Count column.
+        self.totals: Dict[Tuple[str, ...], Dict[Group, Dict[str, int]]] = {
+            grouping: {} for grouping in GROUPINGS
+        }
+        self.by_year: Dict[str, Dict[str, int]] = {}
+        self.__rankings: Dict[Tuple, List[Tuple[str, int]]] = {}
+        self.__years: Dict[str, List[Tuple[str, int]]] = {}
+        self.__lock = threading.Lock()
+        for row_id, row in enumerate(dataset):
+            if row and (live is None or live.is_live(row_id)):
+                self.__apply(row, 1)
+
+    def __apply(self, row: List, sign: int) -> None:
+        # Adds (sign 1) or subtracts (sign -1) a row's count, dropping
+        # totals that fall to zero, and forgets the affected rankings.
+        name = row[COLUMNS["name"]]
+        count = sign * int(row[COLUMNS["count"]])
+        for grouping in GROUPINGS:
+            key = group_key(grouping, row)
+            names = self.totals[grouping].setdefault(key, {})
+            names[name] = names.get(name, 0) + count
+            if sign < 0 and not names[name]:
+                del names[name]
+            self.__rankings.pop((grouping, key), None)
+        year = row[COLUMNS["year"]]
+        years = self.by_year.setdefault(name, {})
+        years[year] = years.get(year, 0) + count
+        if sign < 0 and not years[year]:
+            del years[year]
+        self.__years.pop(name, None)
+
+    def add(self, row: List) -> None:
+        """
+        Counts a new live row.
+        """
+        with self.__lock:
+            self.__apply(row, 1)
+
+    def remove(self, row: List) -> None:
+        """
+        Uncounts a deleted row.
+        """
+        with self.__lock:
+            self.__apply(row, -1)
+
+    def top_names(self, year: Optional[str] = None,
+                  gender: Optional[str] = None,
+                  ethnicity: Optional[str] = None) -> List[Tuple[str, int]]:
+        """
+        Ranks the names of a group by total count, highest first and ties
+        by name. Omitted columns are aggregated over.
+
+        Returns:
+            List[Tuple[str, int]]: (name, total) pairs.
+        """
+        given = {"year": year, "gender": gender, "ethnicity": ethnicity}
+        grouping = tuple(column for column in GROUP_COLUMNS
+                         if given[column] is not None)
+        key = tuple((column, str(given[column])) for column in grouping)
+        with self.__lock:
+            ranking = self.__rankings.get((grouping, key))
+            if ranking is None:
+                names = self.totals[grouping].get(key, {})
+                ranking = sorted(names.items(),
+                                 key=lambda item: (-item[1], item[0]))
+                self.__rankings[(grouping, key)] = ranking
+        return ranking
+
+    def popularity(self, name: str) -> List[Tuple[str, int]]:
+        """
+        Returns a name's total count per year, oldest year first.
+
+        Returns:
+            List[Tuple[str, int]]: (year, total) pairs.
+        """
+        with self.__lock:
+            years = self.__years.get(name)
+            if years is None:
+                years = sorted(self.by_year.get(name, {}).items(),
+                               key=lambda item: int(item[0]))
+                self.__years[name] = years
+        return years
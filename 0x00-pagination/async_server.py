@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+asyncio front end for the pagination servers.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor
+from typing import Callable, Dict, Hashable, List, Optional
+
+from metrics import MetricsRegistry, record_page
+from page_cache import PageCache, copy_response
+from secondary_index import normalize_filters
+
+HyperServer = __import__('2-hypermedia_pagination').Server
+
+# Once the data is loaded, unfiltered pages of up to this many rows are
+# built on the event loop; they take microseconds, less than an executor
+# round trip. Everything else runs in the executor.
+INLINE_ROWS = 100
+
+
+class AsyncServer:
+    """
+    Awaitable `get_page`, `get_hyper` and `get_hyper_index` that never
+    block the event loop.
+
+    Loading, index building and large or filtered pages run in an
+    executor. Concurrent identical requests share a single call and each
+    get their own copy of the response. An instance must only be used from
+    one event loop.
+
+    All three read one loaded dataset: `get_hyper_index` pages through
+    the hypermedia server's `indexed_dataset()`, so rows added or deleted
+    through `pages` show up there too.
+    """
+
+    def __init__(self, storage: str = "list", warm_up: bool = False,
+                 executor: Optional[Executor] = None,
+                 page_cache: Optional[PageCache] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            storage (str): Backing store, see `dataset_storage.STORAGES`.
+            warm_up (bool): Start loading the dataset in the background.
+            executor (Executor): Where blocking work runs; defaults to the
+                loop's default thread pool.
+            page_cache (PageCache): Optional cache for `get_hyper`.
+            metrics (MetricsRegistry): Optional metrics sink.
+        """
+        # Loads on first use; change rows through it, e.g. `delete_row`.
+        self.pages = HyperServer(storage, warm_up, page_cache, metrics)
+        self.metrics = metrics
+        self.executor = executor
+        self.__inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def is_ready(self) -> bool:
+        """
+        Readiness probe: tells whether the dataset has been loaded.
+        """
+        return self.pages.is_ready()
+
+    async def ready(self) -> None:
+        """
+        Awaits the dataset without blocking the event loop.
+        """
+        await self.pages.ready()
+
+    async def __run(self, key: Hashable, call: Callable, *args):
+        # Runs `call` in the executor, unless an identical request is
+        # already in flight, in which case its result is shared.
+        future = self.__inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor,
+                                          functools.partial(call, *args))
+            self.__inflight[key] = future
+            future.add_done_callback(
+                lambda done: self.__inflight.pop(key, None)
+                if self.__inflight.get(key) is done else None)
+        # A cancelled waiter must not cancel the call the others wait on.
+        return await asyncio.shield(future)
+
+    async def get_page(self, page: int = 1, page_size: int = 10,
+                       filters: Optional[Dict] = None,
+                       sort: Optional[str] = None) -> List[List]:
+        """
+        Awaitable `Server.get_page`, see 2-hypermedia_pagination.py.
+        """
+        if not filters and not sort and self.pages.is_ready() and \
+                isinstance(page_size, int) and page_size <= INLINE_ROWS:
+            return self.pages.get_page(page, page_size)
+        key = ("get_page", page, page_size, normalize_filters(filters), sort)
+        data = await self.__run(key, self.pages.get_page, page, page_size,
+                                filters, sort)
+        return [list(row) for row in data]
+
+    async def get_hyper(self, page: int = 1, page_size: int = 10,
+                        filters: Optional[Dict] = None,
+                        sort: Optional[str] = None) -> Dict:
+        """
+        Awaitable `Server.get_hyper`, see 2-hypermedia_pagination.py.
+        """
+        if not filters and not sort and self.pages.is_ready() and \
+                isinstance(page_size, int) and page_size <= INLINE_ROWS:
+            return self.pages.get_hyper(page, page_size)
+        key = ("get_hyper", page, page_size, normalize_filters(filters),
+               sort)
+        info = await self.__run(key, self.pages.get_hyper, page, page_size,
+                                filters, sort)
+        return copy_response(info)
+
+    def __hyper_index(self, index: Optional[int], page_size: int) -> Dict:
+        # Same response and metrics as the deletion-resilient server's
+        # get_hyper_index, over the rows of `pages`.
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        response, end = self.pages.indexed_dataset().hyper_index(index,
+                                                                 page_size)
+        if metrics is not None:
+            record_page(metrics, "get_hyper_index", started,
+                        len(response['data']), end - response['index'])
+        return response
+
+    async def get_hyper_index(self, index: int = None,
+                              page_size: int = 10) -> Dict:
+        """
+        Awaitable `Server.get_hyper_index`, see
+        3-hypermedia_del_pagination.py.
+        """
+        # Inline only once the indexed view exists; building it indexes
+        # every row.
+        if self.pages.is_indexed() and isinstance(page_size, int) and \
+                page_size <= INLINE_ROWS:
+            return self.__hyper_index(index, page_size)
+        key = ("get_hyper_index", index, page_size)
+        response = await self.__run(key, self.__hyper_index, index,
+                                    page_size)
+        return copy_response(response)
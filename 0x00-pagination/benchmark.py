@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for `get_page`, `get_hyper` and `get_hyper_index`
+on synthetic baby-name datasets.
+
+Every case (method, rows, storage, deletion ratio) runs in a fresh process
+so load time and peak RSS are measured in isolation. Generated datasets
+are cached by row count and seed; 1e8 rows take about 4 GB on disk.
+
+Usage: ./benchmark.py --rows 100000 1000000 --deletions 0 0.1 -o run.json
+       ./benchmark.py --compare baseline.json run.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then omitted.
+    resource = None
+
+HEADER = "Year of Birth,Gender,Ethnicity,Child's First Name,Count,Rank\n"
+YEARS = range(2011, 2017)
+GENDERS = ("FEMALE", "MALE")
+ETHNICITIES = ("ASIAN AND PACIFIC ISLANDER", "BLACK NON HISPANIC",
+               "HISPANIC", "WHITE NON HISPANIC")
+SYLLABLES = ("a", "bel", "da", "el", "ian", "is", "ja", "ka", "li", "ma",
+             "na", "o", "ra", "sa", "th", "ton", "va", "ya", "za", "en")
+# Module and attribute of the server method benchmarked under each name.
+METHODS = {
+    "get_page": "1-simple_pagination",
+    "get_hyper": "2-hypermedia_pagination",
+    "get_hyper_index": "3-hypermedia_del_pagination",
+}
+PATTERNS = ("first", "deep", "random")
+# Deep requests target the last this many pages.
+DEEP_PAGES = 100
+# Lines written per call while generating a dataset.
+WRITE_BATCH = 100000
+
+
+def generate_dataset(path: str, rows: int, seed: int = 0) -> None:
+    """
+    Writes `rows` synthetic rows shaped like Popular_Baby_Names.csv.
+
+    The same `rows` and `seed` always produce the same file.
+    """
+    rng = random.Random(seed)
+    names = sorted({
+        "".join(rng.choice(SYLLABLES)
+                for _ in range(rng.randint(2, 4))).capitalize()
+        for _ in range(4000)
+    })
+    with open(path, "w") as f:
+        f.write(HEADER)
+        lines = []
+        for _ in range(rows):
+            lines.append("{},{},{},{},{},{}\n".format(
+                rng.choice(YEARS), rng.choice(GENDERS),
+                rng.choice(ETHNICITIES), rng.choice(names),
+                rng.randint(10, 300), rng.randint(1, 100)))
+            if len(lines) == WRITE_BATCH:
+                f.write("".join(lines))
+                lines = []
+        f.write("".join(lines))
+
+
+def dataset_path(directory: str, rows: int, seed: int = 0) -> str:
+    """
+    Returns the path of the cached synthetic dataset, generating it first
+    if needed.
+    """
+    path = os.path.join(directory,
+                        "baby_names_{}_{}.csv".format(rows, seed))
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        partial = path + ".tmp"
+        generate_dataset(partial, rows, seed)
+        os.replace(partial, path)
+    return path
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Returns the peak resident set size of this process in bytes.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted `samples`.
+    """
+    rank = max(int(round(fraction * len(samples) + 0.5)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Reduces per-request latencies in seconds to the reported statistics.
+    """
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "requests": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "max_ms": samples[-1] * 1000,
+        "throughput": len(samples) / total if total else 0.0,
+    }
+
+
+def positions(pattern: str, last: int, count: int,
+              rng: random.Random) -> List[int]:
+    """
+    Picks `count` positions between 1 and `last` for an access pattern.
+    """
+    if pattern == "first":
+        return [1] * count
+    if pattern == "deep":
+        return [rng.randint(max(last - DEEP_PAGES + 1, 1), last)
+                for _ in range(count)]
+    return [rng.randint(1, last) for _ in range(count)]
+
+
+def run_case(path: str, method: str, storage: str, deletion_ratio: float,
+             requests: int, page_size: int, seed: int) -> Dict:
+    """
+    Loads one server, deletes a share of its rows and times `requests`
+    calls of `method` per access pattern.
+
+    Meant to run in a fresh process; see `main`.
+    """
+    server = __import__(METHODS[method]).Server(storage=storage)
+    server.DATA_FILE = path
+    rng = random.Random(seed)
+
+    start = time.perf_counter()
+    if method == "get_hyper_index":
+        indexed = server.indexed_dataset()
+    else:
+        server.dataset()
+    load_seconds = time.perf_counter() - start
+
+    rows = len(server.dataset())
+    deleted = rng.sample(range(rows), int(rows * deletion_ratio))
+    start = time.perf_counter()
+    for row_id in deleted:
+        if method == "get_hyper_index":
+            del indexed[row_id]
+        else:
+            server.delete_row(row_id)
+    delete_seconds = time.perf_counter() - start
+
+    live = rows - len(deleted)
+    operations = {}
+    for pattern in PATTERNS:
+        if method == "get_hyper_index":
+            # Indexes are positions in the file, deleted or not.
+            last = max(indexed.span - page_size + 1, 1)
+            call = server.get_hyper_index
+            arguments = [index - 1 for index in
+                         positions(pattern, last, requests, rng)]
+        else:
+            last = max(-(-live // page_size), 1)
+            call = getattr(server, method)
+            arguments = positions(pattern, last, requests, rng)
+        samples = []
+        for argument in arguments:
+            start = time.perf_counter()
+            call(argument, page_size)
+            samples.append(time.perf_counter() - start)
+        operations[pattern] = summarize(samples)
+
+    return {
+        "method": method,
+        "rows": rows,
+        "storage": storage,
+        "deletion_ratio": deletion_ratio,
+        "deleted_rows": len(deleted),
+        "load_seconds": load_seconds,
+        "delete_seconds": delete_seconds,
+        "peak_rss_bytes": peak_rss(),
+        "operations": operations,
+    }
+
+
+def case_key(result: Dict) -> tuple:
+    """
+    Identifies a case across runs.
+    """
+    return (result["method"], result["rows"], result["storage"],
+            result["deletion_ratio"])
+
+
+def compare(baseline: Dict, current: Dict,
+            tolerance: float = 0.1) -> List[str]:
+    """
+    Lists latency and load-time regressions of `current` against
+    `baseline` larger than `tolerance` (a fraction, 0.1 for 10%).
+    """
+    previous = {case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(case_key(result))
+        if old is None:
+            continue
+        metrics = [("load_seconds", old["load_seconds"],
+                    result["load_seconds"])]
+        for pattern, stats in result["operations"].items():
+            if pattern not in old["operations"]:
+                continue
+            for name in ("p50_ms", "p99_ms"):
+                metrics.append(("{} {}".format(pattern, name),
+                                old["operations"][pattern][name],
+                                stats[name]))
+        for name, before, after in metrics:
+            if before and after > before * (1 + tolerance):
+                regressions.append("{} {} rows={} deletions={}: {} "
+                                   "{:.3f} -> {:.3f} (+{:.0%})".format(
+                                       result["method"], result["storage"],
+                                       result["rows"],
+                                       result["deletion_ratio"], name,
+                                       before, after, after / before - 1))
+    return regressions
+
+
+def main() -> None:
+    """
+    Runs the requested cases, or compares two saved runs.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pagination servers.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000],
+                        help="dataset sizes, e.g. 100000 100000000")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS),
+                        choices=list(METHODS))
+    parser.add_argument("--storages", nargs="+", default=["list"],
+                        help="names from dataset_storage.STORAGES")
+    parser.add_argument("--deletions", type=float, nargs="+", default=[0.0],
+                        help="share of rows deleted before timing")
+    parser.add_argument("--requests", type=int, default=1000,
+                        help="requests per access pattern")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default="benchmark_data",
+                        help="where generated datasets are cached")
+    parser.add_argument("-o", "--output", help="write results to this file")
+    parser.add_argument("--compare", nargs=2,
+                        metavar=("BASELINE", "CURRENT"),
+                        help="report regressions between two saved runs")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        for line in regressions:
+            print(line)
+        sys.exit(1 if regressions else 0)
+
+    results = []
+    for rows in args.rows:
+        path = dataset_path(args.data_dir, rows, args.seed)
+        for method in args.methods:
+            for storage in args.storages:
+                for ratio in args.deletions:
+                    if ratio and method == "get_page":
+                        # The simple server cannot delete rows.
+                        continue
+                    # A fresh interpreter per case keeps RSS comparable.
+                    with ProcessPoolExecutor(
+                            max_workers=1,
+                            mp_context=get_context("spawn")) as pool:
+                        result = pool.submit(
+                            run_case, path, method, storage, ratio,
+                            args.requests, args.page_size, args.seed).result()
+                    results.append(result)
+                    print("{} {} rows={} deletions={}: load {:.2f}s, "
+                          "random p50 {:.3f}ms p99 {:.3f}ms".format(
+                              method, storage, rows, ratio,
+                              result["load_seconds"],
+                              result["operations"]["random"]["p50_ms"],
+                              result["operations"]["random"]["p99_ms"]),
+                          file=sys.stderr)
+
+    report = json.dumps({
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "requests": args.requests,
+            "page_size": args.page_size,
+            "seed": args.seed,
+        },
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Compact, column-oriented storage for the baby-names dataset.
+"""
+import bisect
+import csv
+import sys
+from array import array
+from typing import Iterable, List, Optional, Union
+
+from compressed import bytes_read, open_text
+
+# Typecodes tried in order when a column outgrows its current width.
+INT_TYPECODES = ("i", "q")
+CODE_TYPECODES = ("B", "H", "I")
+BLANK_TYPECODES = ("I", "Q")
+
+
+def _append_widening(values: array, value: int,
+                     typecodes: tuple) -> array:
+    """
+    Appends `value` to `values`, switching to the next wider typecode
+    when it does not fit.
+
+    Returns:
+        array: The array holding the value, possibly a new, wider one.
+    """
+    try:
+        values.append(value)
+        return values
+    except OverflowError:
+        pass
+    for typecode in typecodes[typecodes.index(values.typecode) + 1:]:
+        try:
+            wider = array(typecode, values)
+            wider.append(value)
+            return wider
+        except OverflowError:
+            continue
+    raise OverflowError("{} does not fit in any of {}".format(value,
+                                                              typecodes))
+
+
+class IntColumn:
+    """
+    Column of integers kept in a typed array.
+    """
+
+    def __init__(self, values: array = None):
+        self.values = values if values is not None else array("i")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: str) -> None:
+        """
+        Stores `value` as an integer.
+
+        Raises:
+            ValueError: If `value` does not round-trip through `int` or is
+                too large for a 64-bit array.
+        """
+        number = int(value)
+        if str(number) != value:
+            raise ValueError("{!r} is not a canonical integer".format(value))
+        try:
+            self.values = _append_widening(self.values, number,
+                                           INT_TYPECODES)
+        except OverflowError as e:
+            raise ValueError(str(e))
+
+    def get(self, index: int) -> str:
+        return str(self.values[index])
+
+    def strings(self) -> List[str]:
+        return [str(value) for value in self.values]
+
+
+class DictColumn:
+    """
+    Column of repeated strings stored as small integer codes into a table
+    of interned distinct values.
+    """
+
+    def __init__(self, codes: array = None, values: List[str] = None):
+        self.codes = codes if codes is not None else array("B")
+        self.values = values if values is not None else []
+        self.lookup = {value: code for code, value in enumerate(self.values)}
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "DictColumn":
+        column = cls()
+        for value in strings:
+            column.append(value)
+        return column
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, value: str) -> None:
+        self.codes = _append_widening(self.codes, self.code(value),
+                                      CODE_TYPECODES)
+
+    def code(self, value: str) -> int:
+        """
+        Returns the code of `value`, adding it to the table if needed.
+        """
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self.lookup[value] = code
+        return code
+
+    def get(self, index: int) -> str:
+        return self.values[self.codes[index]]
+
+    def strings(self) -> List[str]:
+        return [self.values[code] for code in self.codes]
+
+
+class ColumnarDataset:
+    """
+    Read-mostly sequence of rows stored column by column.
+
+    Integer columns live in typed arrays and every other column is
+    dictionary-encoded, so a row costs a few bytes instead of a list of
+    Python strings. Rows are rebuilt as lists of `str` only when they are
+    indexed or sliced. Blank lines stay as empty rows, like in the list
+    loader, so row positions match every other storage.
+    """
+
+    # Rows can be appended in place (see `dataset_storage.is_writable`).
+    writable = True
+    # Bytes of the source file parsed into the dataset, if known.
+    source_size: Optional[int] = None
+
+    def __init__(self, header: List[str],
+                 columns: List[Union[IntColumn, DictColumn]] = None,
+                 blanks: array = None):
+        """
+        Args:
+            header (List[str]): Column names from the CSV header row.
+            columns (List): Pre-built columns; new, empty integer columns
+                are created when omitted.
+            blanks (array): Ascending positions of blank rows, whose
+                column values are placeholders.
+        """
+        self.header = header
+        self.columns = columns if columns is not None else [
+            IntColumn() for _ in header
+        ]
+        self.blanks = blanks if blanks is not None else array("I")
+
+    @classmethod
+    def from_rows(cls, header: List[str],
+                  rows: Iterable[List]) -> "ColumnarDataset":
+        """
+        Builds a dataset from an iterable of rows.
+        """
+        dataset = cls(header)
+        for row in rows:
+            dataset.append(row)
+        return dataset
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ColumnarDataset":
+        """
+        Parses the CSV file at `path`, skipping the header row. Compressed
+        files are decompressed as they are read.
+        """
+        with open_text(path) as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            dataset = cls.from_rows(header, reader)
+            dataset.source_size = bytes_read(f)
+        return dataset
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def append(self, row: List) -> None:
+        """
+        Appends one row; a blank line is kept as an empty row.
+
+        A column that first looked numeric is re-encoded as a dictionary
+        column as soon as a value does not round-trip through `int`.
+        The first column, which defines the length, is extended last so
+        concurrent readers never see a partially appended row.
+        """
+        if not row:
+            self.blanks = _append_widening(self.blanks, len(self),
+                                           BLANK_TYPECODES)
+            row = ["0" if isinstance(column, IntColumn) else ""
+                   for column in self.columns]
+        assert len(row) == len(self.columns), \
+            "Row width does not match the header."
+        for i in reversed(range(len(row))):
+            value = row[i]
+            column = self.columns[i]
+            if isinstance(column, IntColumn):
+                try:
+                    column.append(value)
+                    continue
+                except ValueError:
+                    column = DictColumn.from_strings(column.strings())
+                    self.columns[i] = column
+            column.append(value)
+
+    def extend(self, other: "ColumnarDataset") -> None:
+        """
+        Appends every row of `other` column by column, merging typed arrays
+        and remapping dictionary codes instead of rebuilding rows.
+        """
+        assert len(other.columns) == len(self.columns), \
+            "Row width does not match the header."
+        offset = len(self)
+        for row_id in other.blanks:
+            self.blanks = _append_widening(self.blanks, offset + row_id,
+                                           BLANK_TYPECODES)
+        for i in reversed(range(len(self.columns))):
+            mine, theirs = self.columns[i], other.columns[i]
+            if isinstance(mine, IntColumn) and isinstance(theirs, IntColumn):
+                typecode = max(mine.values.typecode, theirs.values.typecode,
+                               key=INT_TYPECODES.index)
+                if mine.values.typecode != typecode:
+                    mine.values = array(typecode, mine.values)
+                mine.values.extend(array(typecode, theirs.values))
+                continue
+            if isinstance(mine, IntColumn):
+                mine = self.columns[i] = DictColumn.from_strings(
+                    mine.strings())
+            if isinstance(theirs, IntColumn):
+                theirs = DictColumn.from_strings(theirs.strings())
+            remap = [mine.code(value) for value in theirs.values]
+            if remap == list(range(len(remap))):
+                codes = theirs.codes
+            else:
+                codes = [remap[code] for code in theirs.codes]
+            for typecode in CODE_TYPECODES[
+                    CODE_TYPECODES.index(mine.codes.typecode):]:
+                try:
+                    extra = array(typecode, codes)
+                except OverflowError:
+                    continue
+                if typecode != mine.codes.typecode:
+                    mine.codes = array(typecode, mine.codes)
+                mine.codes.extend(extra)
+                break
+
+    def is_blank(self, index: int) -> bool:
+        """
+        Tells whether row `index` was a blank line.
+        """
+        blanks = self.blanks
+        i = bisect.bisect_left(blanks, index)
+        return i < len(blanks) and blanks[i] == index
+
+    def row(self, index: int) -> List[str]:
+        if len(self.blanks) and self.is_blank(index):
+            return []
+        return [column.get(index) for column in self.columns]
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[List, List[List]]:
+        """
+        Returns one row, or a list of rows for a slice.
+        """
+        length = len(self)
+        if isinstance(key, slice):
+            return [self.row(i) for i in range(*key.indices(length))]
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError("ColumnarDataset index out of range")
+        return self.row(key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
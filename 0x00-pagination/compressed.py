@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Compressed dataset files: gzip, zstd and a seekable block format.
+
+gzip and zstd files are decompressed as a stream while they are parsed.
+Block files hold independently compressed runs of rows followed by a
+block index, so `BlockDataset` decompresses only the blocks a page
+touches. Formats are recognized by their leading magic bytes.
+
+Usage: ./compressed.py [--codec zlib|zstd] [--rows-per-block N] SOURCE TARGET
+"""
+import argparse
+import csv
+import functools
+import gzip
+import io
+import json
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import IO, Iterator, List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # Only needed for zstd files and zstd blocks.
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+BLOCK_MAGIC = b"BNBLOCK1"
+# Index offset, index length and magic, at the very end of a block file.
+FOOTER = struct.Struct("<QI8s")
+ROWS_PER_BLOCK = 4096
+# Decompressed blocks kept per `BlockDataset`.
+BLOCK_CACHE_SIZE = 8
+
+
+def compression(path: str) -> Optional[str]:
+    """
+    Tells how the file at `path` is compressed.
+
+    Returns:
+        Optional[str]: "gzip", "zstd" or "blocks", or None for plain text.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(BLOCK_MAGIC))
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic.startswith(ZSTD_MAGIC):
+        return "zstd"
+    if magic == BLOCK_MAGIC:
+        return "blocks"
+    return None
+
+
+def _zstandard():
+    assert zstandard is not None, \
+        "Reading zstd data needs the zstandard package."
+    return zstandard
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return _zstandard().ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class _BlockReader(io.RawIOBase):
+    """
+    Raw stream of a block file's header line and rows, decompressed one
+    block at a time.
+    """
+
+    def __init__(self, path: str):
+        self.__dataset = BlockDataset(path, cache_size=0)
+        header = io.StringIO()
+        csv.writer(header, lineterminator="\n").writerow(
+            self.__dataset.header)
+        self.__pending = header.getvalue().encode("utf-8")
+        self.__position = 0
+        self.__block = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self.__position == len(self.__pending) and \
+                self.__block < self.__dataset.block_count:
+            self.__pending = self.__dataset.block_bytes(self.__block)
+            self.__position = 0
+            self.__block += 1
+        start = self.__position
+        size = min(len(buffer), len(self.__pending) - start)
+        buffer[:size] = self.__pending[start:start + size]
+        self.__position += size
+        return size
+
+    def close(self) -> None:
+        self.__dataset.close()
+        super().close()
+
+
+def open_text(path: str) -> IO[str]:
+    """
+    Opens a CSV file for reading as text, decompressing it on the fly if
+    it is gzip, zstd or block compressed.
+    """
+    kind = compression(path)
+    if kind is None:
+        return open(path)
+    if kind == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if kind == "zstd":
+        raw = _zstandard().ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True)
+    else:
+        raw = io.BufferedReader(_BlockReader(path))
+    return io.TextIOWrapper(raw, encoding="utf-8")
+
+
+def bytes_read(f: IO[str]) -> Optional[int]:
+    """
+    Returns how many bytes of a plain file opened with `open_text` have
+    been read so far, i.e. its size once the stream is exhausted, or None
+    for compressed files, whose offsets do not map to the file.
+    """
+    buffer = getattr(f, "buffer", None)
+    if isinstance(buffer, io.BufferedReader) and \
+            isinstance(buffer.raw, io.FileIO):
+        return buffer.tell()
+    return None
+
+
+class BlockDataset:
+    """
+    Read-only sequence of CSV rows stored in a block file.
+
+    Only the block index is held in memory; indexing or slicing
+    decompresses and parses the blocks holding the requested rows and
+    keeps the most recent ones in a small cache.
+    """
+
+    def __init__(self, path: str, cache_size: int = BLOCK_CACHE_SIZE):
+        """
+        Args:
+            path (str): Path to the block file.
+            cache_size (int): Number of parsed blocks to keep.
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self.__file = open(path, "rb")
+        self.__file.seek(-FOOTER.size, os.SEEK_END)
+        index_offset, index_length, magic = FOOTER.unpack(
+            self.__file.read(FOOTER.size))
+        assert magic == BLOCK_MAGIC, "Not a block file: {}".format(path)
+        self.__file.seek(index_offset)
+        index = json.loads(self.__file.read(index_length).decode("utf-8"))
+        self.header: List[str] = index["header"]
+        self.codec: str = index["codec"]
+        # Block k is lengths[k] bytes at offsets[k], holding the rows from
+        # first_rows[k] up to first_rows[k + 1].
+        self.__offsets = array("Q", index["offsets"])
+        self.__lengths = array("Q", index["lengths"])
+        self.__first_rows = array("Q", [0])
+        for rows in index["rows"]:
+            self.__first_rows.append(self.__first_rows[-1] + rows)
+        self.__cache: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @property
+    def block_count(self) -> int:
+        """
+        Returns the number of compressed blocks.
+        """
+        return len(self.__offsets)
+
+    def __len__(self) -> int:
+        return self.__first_rows[-1]
+
+    def block_bytes(self, block: int) -> bytes:
+        """
+        Reads and decompresses one block into CSV text bytes.
+        """
+        with self.__lock:
+            self.__file.seek(self.__offsets[block])
+            data = self.__file.read(self.__lengths[block])
+        return _decompress(data, self.codec)
+
+    def __block_rows(self, block: int) -> List[List]:
+        with self.__lock:
+            rows = self.__cache.get(block)
+            if rows is not None:
+                self.__cache.move_to_end(block)
+                return rows
+        text = self.block_bytes(block).decode("utf-8")
+        rows = list(csv.reader(io.StringIO(text)))
+        if self.cache_size:
+            with self.__lock:
+                self.__cache[block] = rows
+                while len(self.__cache) > self.cache_size:
+                    self.__cache.popitem(last=False)
+        return rows
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[List,
+                                                           List[List]]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            rows = []
+            while start < stop:
+                block = bisect_right(self.__first_rows, start) - 1
+                first = self.__first_rows[block]
+                end = min(stop, self.__first_rows[block + 1])
+                rows.extend(self.__block_rows(block)[start - first:
+                                                     end - first])
+                start = end
+            return rows
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("BlockDataset index out of range")
+        block = bisect_right(self.__first_rows, key) - 1
+        return self.__block_rows(block)[key - self.__first_rows[block]]
+
+    def __iter__(self) -> Iterator[List]:
+        # Full scans bypass the cache so they do not evict hot blocks.
+        for block in range(self.block_count):
+            text = self.block_bytes(block).decode("utf-8")
+            yield from csv.reader(io.StringIO(text))
+
+    def close(self) -> None:
+        """
+        Closes the underlying file.
+        """
+        self.__file.close()
+
+
+def write_blocks(source: str, target: str, codec: str = "zlib",
+                 rows_per_block: int = ROWS_PER_BLOCK) -> int:
+    """
+    Converts a CSV file, compressed or not, into a block file, streaming
+    both sides.
+
+    Args:
+        source (str): Path to the CSV file.
+        target (str): Path of the block file to write.
+        codec (str): "zlib" (built in) or "zstd".
+        rows_per_block (int): Rows per independently compressed block;
+            smaller blocks make random pages cheaper and compress worse.
+
+    Returns:
+        int: The number of data rows written.
+    """
+    assert codec in ("zlib", "zstd"), "Unknown codec: {}".format(codec)
+    if codec == "zstd":
+        compress = _zstandard().ZstdCompressor(level=9).compress
+    else:
+        compress = functools.partial(zlib.compress, level=9)
+    index = {"codec": codec, "header": [], "offsets": [], "lengths": [],
+             "rows": []}
+
+    def flush(f, buffer: io.StringIO, rows: int) -> None:
+        data = compress(buffer.getvalue().encode("utf-8"))
+        index["offsets"].append(f.tell())
+        index["lengths"].append(len(data))
+        index["rows"].append(rows)
+        f.write(data)
+        buffer.seek(0)
+        buffer.truncate()
+
+    partial = target + ".tmp"
+    total = 0
+    with open_text(source) as text, open(partial, "wb") as f:
+        reader = csv.reader(text)
+        index["header"] = next(reader, [])
+        f.write(BLOCK_MAGIC)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        rows = 0
+        for row in reader:
+            writer.writerow(row)
+            rows += 1
+            if rows == rows_per_block:
+                flush(f, buffer, rows)
+                total += rows
+                rows = 0
+        if rows:
+            flush(f, buffer, rows)
+            total += rows
+        encoded = json.dumps(index, separators=(",", ":")).encode("utf-8")
+        offset = f.tell()
+        f.write(encoded)
+        f.write(FOOTER.pack(offset, len(encoded), BLOCK_MAGIC))
+    os.replace(partial, target)
+    return total
+
+
+def main() -> None:
+    """
+    Converts a CSV file into a block file.
+    """
+    parser = argparse.ArgumentParser(
+        description="Write a seekable block-compressed copy of a CSV file.")
+    parser.add_argument("source", help="CSV file, optionally gzip or zstd")
+    parser.add_argument("target", help="block file to write")
+    parser.add_argument("--codec", choices=("zlib", "zstd"), default="zlib")
+    parser.add_argument("--rows-per-block", type=int,
+                        default=ROWS_PER_BLOCK)
+    args = parser.parse_args()
+    rows = write_blocks(args.source, args.target, args.codec,
+                        args.rows_per_block)
+    print("{}: {} rows, {} bytes".format(args.target, rows,
+                                         os.path.getsize(args.target)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Exact and estimated row counts for filtered views of the dataset.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from secondary_index import (Predicate, SecondaryIndexes, matches,
+                             normalize_filters)
+
+# Number of predicates whose exact count is remembered.
+COUNT_CACHE_SIZE = 4096
+
+
+class CountCache:
+    """
+    Remembers the number of rows matching each filter predicate.
+
+    Counts are adjusted in place when rows are added or removed, so they
+    stay exact without rescanning; `estimate` answers uncached predicates
+    in O(number of filters) from posting-list sizes.
+    """
+
+    def __init__(self, indexes: SecondaryIndexes,
+                 size: int = COUNT_CACHE_SIZE):
+        self.indexes = indexes
+        self.size = size
+        self.__counts: OrderedDict = OrderedDict()
+
+    def __remember(self, predicate: Predicate, count: int) -> int:
+        self.__counts[predicate] = count
+        if len(self.__counts) > self.size:
+            self.__counts.popitem(last=False)
+        return count
+
+    def __cached(self, predicate: Predicate) -> Optional[int]:
+        count = self.__counts.get(predicate)
+        if count is not None:
+            self.__counts.move_to_end(predicate)
+        return count
+
+    def total(self) -> int:
+        """
+        Returns the number of indexed rows.
+        """
+        return len(self.indexes.order["count"])
+
+    def count(self, filters: Optional[Dict] = None) -> int:
+        """
+        Returns the exact number of rows matching `filters`.
+        """
+        predicate = normalize_filters(filters)
+        if not predicate:
+            return self.total()
+        count = self.__cached(predicate)
+        if count is None:
+            count = self.__remember(predicate, self.indexes.count(filters))
+        return count
+
+    def estimate(self, filters: Optional[Dict] = None) -> int:
+        """
+        Returns the cached exact count for `filters` or, when there is
+        none, an estimate that assumes the filters are independent.
+
+        A single equality filter is always exact.
+        """
+        predicate = normalize_filters(filters)
+        if not predicate:
+            return self.total()
+        count = self.__cached(predicate)
+        if count is not None:
+            return count
+
+        total = self.total()
+        if not total:
+            return 0
+        fraction = 1.0
+        for key, value in predicate:
+            if key == "name_prefix":
+                postings = self.indexes.postings["name"]
+                matched = sum(len(postings[name]) for name in
+                              self.indexes.names_with_prefix(value))
+            else:
+                matched = len(self.indexes.postings[key].get(value, ()))
+            fraction *= matched / total
+        if len(predicate) == 1 and predicate[0][0] != "name_prefix":
+            return self.__remember(predicate, round(fraction * total))
+        return round(fraction * total)
+
+    def add(self, row: List) -> None:
+        """
+        Counts a newly added row in every cached predicate it matches.
+        """
+        for predicate in self.__counts:
+            if matches(row, predicate):
+                self.__counts[predicate] += 1
+
+    def remove(self, row: List) -> None:
+        """
+        Uncounts a deleted row from every cached predicate it matches.
+        """
+        for predicate in self.__counts:
+            if matches(row, predicate):
+                self.__counts[predicate] -= 1
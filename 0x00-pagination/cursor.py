@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Signed, opaque pagination cursors.
+
+A cursor encodes the stable row position to resume from and the version
+of the dataset it was issued for. It is signed with HMAC-SHA256, so any
+worker that shares the secret can validate it and resume in O(log n).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+from typing import Dict, Union
+
+# Bytes of the HMAC-SHA256 digest kept in each token.
+SIGNATURE_SIZE = 16
+# Leading bytes of the dataset file that identify a version.
+VERSION_PREFIX = 1 << 16
+# Foreign version tokens remembered per version.
+VERDICT_CACHE_SIZE = 64
+# Fallback signing key when PAGINATION_CURSOR_SECRET is not set.
+_PROCESS_SECRET = os.urandom(32)
+
+
+class CursorError(ValueError):
+    """
+    Raised for cursors that are malformed, tampered with or issued for
+    another version of the dataset.
+    """
+
+
+class DatasetVersion:
+    """
+    Identifies the dataset file a worker loaded, captured once at load.
+
+    A version is the length and a digest of the file's first bytes, so
+    it depends on content only: identical copies on other hosts, in
+    other containers or after a deploy share it. Appending rows keeps
+    those bytes, so cursors stay valid across appends and `refresh()`.
+    Rewriting the leading bytes yields a new version whose cursors the
+    old rows reject, and the other way round. Rewrites that keep the
+    first VERSION_PREFIX bytes are not detected.
+    """
+
+    def __init__(self, path: str):
+        """
+        Reads the identity of the file at `path` as it is now.
+        """
+        with open(path, "rb") as f:
+            self.prefix = f.read(VERSION_PREFIX)
+        self.path = path
+        self.token = "{:x}-{}".format(len(self.prefix), _digest(self.prefix))
+        # Verdicts on tokens of other workers; tokens are trusted once
+        # their signature checks out, so this stays small.
+        self.__verdicts: Dict[str, bool] = {self.token: True}
+
+    def accepts(self, token: str) -> bool:
+        """
+        Tells whether `token` names this version, possibly as loaded by a
+        worker that read more or less of the file.
+        """
+        verdict = self.__verdicts.get(token)
+        if verdict is None:
+            verdict = self.__accepts(token)
+            if len(self.__verdicts) >= VERDICT_CACHE_SIZE:
+                self.__verdicts = {self.token: True}
+            self.__verdicts[token] = verdict
+        return verdict
+
+    def __accepts(self, token: str) -> bool:
+        length, _, digest = token.partition("-")
+        try:
+            length = int(length, 16)
+        except ValueError:
+            return False
+        if length <= len(self.prefix):
+            return _digest(self.prefix[:length]) == digest
+        # The issuer read more of the then shorter file; compare against
+        # the file, provided it still starts with the bytes loaded here.
+        try:
+            with open(self.path, "rb") as f:
+                prefix = f.read(min(length, VERSION_PREFIX))
+        except OSError:
+            return False
+        return prefix.startswith(self.prefix) and _digest(prefix) == digest
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: bytes, secret: Union[str, bytes]) -> bytes:
+    if isinstance(secret, str):
+        secret = secret.encode("utf-8")
+    return hmac.new(secret, payload, hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+
+def encode_cursor(position: int, version: DatasetVersion,
+                  secret: Union[str, bytes]) -> str:
+    """
+    Builds a token for resuming at `position` of dataset `version`.
+
+    Args:
+        position (int): Stable row position of the next row to return.
+        version (DatasetVersion): Dataset the position refers to.
+        secret (Union[str, bytes]): Key shared by every worker.
+
+    Returns:
+        str: A URL-safe opaque token.
+    """
+    payload = json.dumps({"p": position, "v": version.token},
+                         separators=(",", ":")).encode("utf-8")
+    return "{}.{}".format(_b64encode(payload),
+                          _b64encode(_sign(payload, secret)))
+
+
+def decode_cursor(token: str, version: DatasetVersion,
+                  secret: Union[str, bytes]) -> int:
+    """
+    Validates `token` and extracts the row position it encodes.
+
+    Args:
+        token (str): A token produced by `encode_cursor`.
+        version (DatasetVersion): The dataset this worker loaded.
+        secret (Union[str, bytes]): Key shared by every worker.
+
+    Returns:
+        int: The stable row position to resume from.
+
+    Raises:
+        CursorError: If the token is malformed, its signature does not
+            match or it was issued for another dataset version.
+    """
+    try:
+        payload_part, signature_part = token.split(".")
+        payload = _b64decode(payload_part)
+        signature = _b64decode(signature_part)
+    except (AttributeError, ValueError):
+        raise CursorError("Malformed cursor.")
+    if not hmac.compare_digest(signature, _sign(payload, secret)):
+        raise CursorError("Invalid cursor signature.")
+    fields = json.loads(payload.decode("utf-8"))
+    if not isinstance(fields.get("v"), str) or \
+            not version.accepts(fields["v"]):
+        raise CursorError("Cursor was issued for another dataset version.")
+    position = fields.get("p")
+    if not isinstance(position, int) or position < 0:
+        raise CursorError("Malformed cursor.")
+    return position
+
+
+def default_secret() -> bytes:
+    """
+    Returns the signing key from PAGINATION_CURSOR_SECRET.
+
+    Without it a random per-process key is used, so cursors only work on
+    the worker that issued them; set the variable for multi-worker setups.
+    """
+    secret = os.environ.get("PAGINATION_CURSOR_SECRET")
+    if secret:
+        return secret.encode("utf-8")
+    return _PROCESS_SECRET
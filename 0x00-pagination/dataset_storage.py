@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Backing stores the pagination Server classes can load their dataset into.
+"""
+import csv
+from typing import (Callable, Dict, Iterator, List, Optional, Sequence,
+                    Tuple, Union)
+
+from columnar_dataset import ColumnarDataset
+from compressed import BlockDataset, bytes_read, compression, open_text
+from ingest import RowList
+from mapped_dataset import MappedDataset
+from parallel_loader import load_parallel, load_parallel_columnar
+from shared_dataset import load_shared
+from snapshot import load_snapshot
+
+
+def load_rows(path: str) -> List[List]:
+    """
+    Reads the whole CSV file into a list of rows.
+
+    Args:
+        path (str): Path to the CSV file, optionally compressed.
+
+    Returns:
+        List[List]: Every row of the file, excluding the header row.
+    """
+    with open_text(path) as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip the header row
+        dataset = RowList(reader)
+        dataset.source_size = bytes_read(f)
+    return dataset
+
+
+def load_mapped(path: str) -> Sequence:
+    """
+    Opens `path` for lazy row access: memory-mapped if it is plain text,
+    block by block if it is a block file.
+    """
+    kind = compression(path)
+    if kind == "blocks":
+        return BlockDataset(path)
+    assert kind is None, \
+        "{} input cannot be memory-mapped; convert it with " \
+        "compressed.py or pick another storage.".format(kind)
+    return MappedDataset(path)
+
+
+# Maps a storage name to the callable that loads a file into that store.
+STORAGES: Dict[str, Callable[[str], Sequence]] = {
+    "list": load_rows,
+    "mmap": load_mapped,
+    "blocks": BlockDataset,
+    "columnar": ColumnarDataset.from_csv,
+    "snapshot": load_snapshot,
+    "shared": load_shared,
+    "parallel": load_parallel,
+    "parallel-columnar": load_parallel_columnar,
+}
+
+
+def is_writable(dataset: Sequence) -> bool:
+    """
+    Tells whether rows can be appended to a loaded dataset in place.
+
+    Stores declare it with a `writable` attribute; plain lists are
+    writable, and any other store without the attribute is read-only.
+    """
+    return getattr(dataset, "writable", isinstance(dataset, list))
+
+
+def source_size(dataset: Sequence) -> Optional[int]:
+    """
+    Returns how many bytes of its file a loaded dataset was parsed from,
+    where `ingest.FileTail` resumes, or None when the store does not
+    know, e.g. for compressed files.
+    """
+    return getattr(dataset, "source_size", None)
+
+
+def published_arrays(dataset: Sequence) -> Dict[Tuple[str, ...], Sequence]:
+    """
+    Returns the arrays published beside a shared dataset by name, e.g.
+    its prebuilt indexes, or an empty dict for any other store.
+    """
+    return getattr(dataset, "published", {})
+
+
+class AppendOverlay:
+    """
+    Writable view of a read-only store such as "mmap", "blocks" or
+    "shared": the store's rows come first, followed by the rows appended
+    to the view, which are kept in a list.
+    """
+
+    writable = True
+
+    def __init__(self, base: Sequence):
+        """
+        Args:
+            base (Sequence): The read-only store to extend.
+        """
+        self.base = base
+        self.rows: List[List] = []
+        self.source_size = source_size(base)
+        self.published = published_arrays(base)
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.rows)
+
+    def append(self, row: List) -> None:
+        self.rows.append(row)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[List, List[List]]:
+        """
+        Returns one row, or a list of rows for a slice.
+        """
+        size = len(self.base)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if stop <= size:
+                return self.base[start:stop]
+            if start >= size:
+                return self.rows[start - size:stop - size]
+            return self.base[start:size] + self.rows[:stop - size]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < size + len(self.rows):
+            raise IndexError("AppendOverlay index out of range")
+        return self.base[key] if key < size else self.rows[key - size]
+
+    def __iter__(self) -> Iterator[List]:
+        yield from self.base
+        yield from self.rows
+
+
+def writable_dataset(dataset: Sequence) -> Sequence:
+    """
+    Returns `dataset` itself if rows can be appended to it in place, or an
+    `AppendOverlay` over it otherwise.
+    """
+    return dataset if is_writable(dataset) else AppendOverlay(dataset)
+
+
+def load_dataset(path: str, storage: str = "list") -> Sequence:
+    """
+    Loads the dataset at `path` into the requested backing store.
+
+    Args:
+        path (str): Path to the CSV file, plain or compressed (see
+            `compressed.py`).
+        storage (str): Name of the backing store, one of `STORAGES`.
+
+    Returns:
+        Sequence: A sequence of rows supporting `len`, indexing and slicing.
+    """
+    assert storage in STORAGES, "Unknown storage: {}".format(storage)
+    return STORAGES[storage](path)
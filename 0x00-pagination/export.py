@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Streaming CSV and NDJSON sinks for whole-dataset exports.
+"""
+import csv
+import io
+import json
+from typing import IO, Iterable, List, Optional
+
+# Rows buffered before each write to the underlying file.
+CHUNK_ROWS = 1000
+
+
+def write_csv(rows: Iterable[List], f: IO[str],
+              header: Optional[List[str]] = None,
+              chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Writes `rows` to a text file as CSV in chunks of `chunk_rows`.
+
+    Args:
+        rows (Iterable[List]): Rows to write, e.g. `Server.iter_rows()`.
+        f (IO[str]): Text file opened with newline="".
+        header (List[str]): Optional header row written first.
+        chunk_rows (int): Rows per write call.
+
+    Returns:
+        int: The number of data rows written.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            f.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+    f.write(buffer.getvalue())
+    return count
+
+
+def write_ndjson(rows: Iterable[List], f: IO[str],
+                 fields: Optional[List[str]] = None,
+                 chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Writes `rows` to a text file as newline-delimited JSON.
+
+    Args:
+        rows (Iterable[List]): Rows to write, e.g. `Server.iter_rows()`.
+        f (IO[str]): Text file to write to.
+        fields (List[str]): Keys to emit each row as an object; rows are
+            emitted as arrays when omitted.
+        chunk_rows (int): Rows per write call.
+
+    Returns:
+        int: The number of rows written.
+    """
+    lines = []
+    count = 0
+    for row in rows:
+        record = dict(zip(fields, row)) if fields else row
+        lines.append(json.dumps(record))
+        count += 1
+        if len(lines) == chunk_rows:
+            f.write("\n".join(lines) + "\n")
+            lines = []
+    if lines:
+        f.write("\n".join(lines) + "\n")
+    return count
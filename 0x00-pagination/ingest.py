@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Incremental ingestion of rows appended to the dataset file.
+"""
+import csv
+import io
+import threading
+from typing import List, Optional
+
+from compressed import compression
+
+
+class RowList(list):
+    """
+    List of parsed rows that remembers how many bytes of its source file
+    they were parsed from, so a `FileTail` can resume right after them.
+    """
+
+    # Bytes of the source file parsed into the rows; None when unknown,
+    # e.g. for compressed files.
+    source_size: Optional[int] = None
+
+
+class FileTail:
+    """
+    Follows a CSV file that only grows at the end, returning the complete
+    rows added since the last call.
+
+    Reading starts at the byte offset where the loader stopped parsing
+    (the `source_size` of the loaded store), so the first call reads only
+    the new bytes. Only whole lines are consumed, so a row that is still
+    being written is picked up by a later call once its line break lands.
+    Reads stop at the last line break, so fields must not contain quoted
+    line breaks, as with `parallel_loader`.
+    """
+
+    def __init__(self, path: str, offset: int):
+        """
+        Args:
+            path (str): Path to the CSV file.
+            offset (int): Byte offset just after the loaded rows.
+        """
+        assert compression(path) is None, \
+            "Only plain CSV files can be followed."
+        assert isinstance(offset, int) and offset >= 0, \
+            "The loaded store does not record where parsing ended."
+        self.path = path
+        self.offset = offset
+        # Whether the last line read so far ended with a line break.
+        self.__at_line_start: Optional[bool] = None
+        self.__lock = threading.Lock()
+
+    def read_rows(self) -> List[List]:
+        """
+        Parses the complete rows appended since the previous call.
+
+        Returns:
+            List[List]: The new rows in file order, blank lines as empty
+            rows like the loaders keep them.
+        """
+        with self.__lock:
+            with open(self.path, "rb") as f:
+                start = self.offset
+                if self.__at_line_start is None:
+                    # The loader may have parsed a last line without its
+                    # line break; the rest of that line is not a new row.
+                    if start:
+                        f.seek(start - 1)
+                        self.__at_line_start = f.read(1) == b"\n"
+                    else:
+                        self.__at_line_start = True
+                f.seek(start)
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            if not end:
+                return []
+            self.offset += end
+            skip = 0
+            if not self.__at_line_start:
+                skip = data.index(b"\n") + 1
+                self.__at_line_start = True
+        text = data[skip:end].decode("utf-8")
+        return list(csv.reader(io.StringIO(text, newline="")))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Thread-safe, single-flight lazy loading with optional background warm-up.
+"""
+import asyncio
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs an expensive loader at most once, however many threads ask for
+    its value at the same time; concurrent callers wait for that one run.
+
+    A failed load is not cached, so the next caller tries again.
+    """
+
+    def __init__(self, load: Callable[[], T]):
+        self.__load = load
+        self.__lock = threading.Lock()
+        self.__start_lock = threading.Lock()
+        self.__ready = threading.Event()
+        self.__value: Optional[T] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+
+    def get(self) -> T:
+        """
+        Returns the loaded value, loading it first if needed.
+        """
+        # Fast path once loaded: no locking.
+        if self.__ready.is_set():
+            return self.__value
+        with self.__lock:
+            if not self.__ready.is_set():
+                self.__value = self.__load()
+                self.error = None
+                self.__ready.set()
+        return self.__value
+
+    def __warm_up(self) -> None:
+        try:
+            self.get()
+        except Exception as e:
+            self.error = e
+
+    def start(self) -> threading.Thread:
+        """
+        Starts loading in a daemon thread, if not already started.
+
+        Returns:
+            threading.Thread: The warm-up thread.
+        """
+        with self.__start_lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__warm_up,
+                                                 name="dataset-warm-up",
+                                                 daemon=True)
+                self.__thread.start()
+        return self.__thread
+
+    def is_ready(self) -> bool:
+        """
+        Tells whether the value has been loaded.
+        """
+        return self.__ready.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until the value is loaded or `timeout` seconds pass.
+
+        Returns:
+            bool: True if the value is loaded.
+        """
+        return self.__ready.wait(timeout)
+
+    async def ready(self) -> T:
+        """
+        Awaits the loaded value without blocking the event loop, loading
+        it in the default executor if no one else is.
+        """
+        if self.__ready.is_set():
+            return self.__value
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.get)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Order-statistic index over the live (non-deleted) rows of a dataset.
+"""
+from array import array
+from typing import (Dict, Iterator, List, MutableMapping, Optional,
+                    Sequence, Tuple)
+
+from dataset_storage import is_writable, published_arrays
+
+
+class LiveIndex:
+    """
+    Fenwick tree over one live/deleted flag per row position.
+
+    Deleting, restoring, counting the live rows before a position and
+    finding the k-th live row all cost O(log n), however many rows have
+    been deleted.
+    """
+
+    def __init__(self, size: int = 0, published: Dict = None):
+        """
+        Creates an index of `size` positions, all of them live.
+
+        Args:
+            size (int): The number of positions.
+            published (Dict): Arrays exported by `arrays()` from an index
+                with every position live, e.g. views into shared memory,
+                used in place of building new ones until the first
+                change; `size` is then taken from them.
+        """
+        if published is None:
+            self.__flags = bytearray(b"\x01") * size
+            # With every flag set, node i covers lowbit(i) live positions.
+            self.__tree = array("l", (i & -i for i in range(size + 1)))
+        else:
+            self.__flags = published[("live", "flags")]
+            self.__tree = published[("live", "tree")]
+            size = len(self.__flags)
+        self.__live = size
+        self.__top = 1 << max(size.bit_length() - 1, 0)
+
+    def arrays(self) -> Dict[Tuple[str, ...], array]:
+        """
+        Exports the flags and tree by name, for publishing next to a
+        shared dataset.
+        """
+        return {("live", "flags"): array("B", self.__flags),
+                ("live", "tree"): array("l", self.__tree)}
+
+    def __own(self) -> None:
+        """
+        Copies published views into private arrays before the first
+        change; shared memory is read-only.
+        """
+        if isinstance(self.__tree, memoryview):
+            self.__flags = bytearray(self.__flags)
+            self.__tree = array("l", self.__tree)
+
+    def __len__(self) -> int:
+        """
+        Returns the number of positions, live or deleted.
+        """
+        return len(self.__flags)
+
+    @property
+    def live_count(self) -> int:
+        return self.__live
+
+    def is_live(self, position: int) -> bool:
+        return 0 <= position < len(self.__flags) and \
+            self.__flags[position] == 1
+
+    def __add(self, position: int, delta: int) -> None:
+        i = position + 1
+        size = len(self.__flags)
+        while i <= size:
+            self.__tree[i] += delta
+            i += i & -i
+        self.__live += delta
+
+    def delete(self, position: int) -> bool:
+        """
+        Marks `position` deleted.
+
+        Returns:
+            bool: False if the position was not live.
+        """
+        if not self.is_live(position):
+            return False
+        self.__own()
+        self.__flags[position] = 0
+        self.__add(position, -1)
+        return True
+
+    def insert(self, position: int) -> bool:
+        """
+        Marks a deleted `position` live again.
+
+        Returns:
+            bool: False if the position was already live or out of range.
+        """
+        if not 0 <= position < len(self.__flags) or self.__flags[position]:
+            return False
+        self.__own()
+        self.__flags[position] = 1
+        self.__add(position, 1)
+        return True
+
+    def append(self, live: bool = True) -> int:
+        """
+        Adds a new position at the end of the index.
+
+        Returns:
+            int: The new position.
+        """
+        self.__own()
+        position = len(self.__flags)
+        i = position + 1
+        # Node i covers (i - lowbit(i), i]; all but the new position are
+        # already counted by the prefix sums.
+        value = int(live) + self.rank(position) - self.rank(i - (i & -i))
+        self.__flags.append(int(live))
+        self.__tree.append(value)
+        self.__live += int(live)
+        if i >= self.__top << 1:
+            self.__top <<= 1
+        return position
+
+    def rank(self, position: int) -> int:
+        """
+        Counts the live positions strictly before `position`.
+        """
+        i = min(position, len(self.__flags))
+        total = 0
+        while i > 0:
+            total += self.__tree[i]
+            i -= i & -i
+        return total
+
+    def select(self, k: int) -> Optional[int]:
+        """
+        Finds the position of the k-th live row (0-based).
+
+        Returns:
+            Optional[int]: The position, or None if fewer rows are live.
+        """
+        if not 0 <= k < self.__live:
+            return None
+        position, remaining = 0, k + 1
+        step = self.__top
+        size = len(self.__flags)
+        while step:
+            nxt = position + step
+            if nxt <= size and self.__tree[nxt] < remaining:
+                position = nxt
+                remaining -= self.__tree[nxt]
+            step >>= 1
+        return position
+
+    def next_live(self, position: int) -> Optional[int]:
+        """
+        Finds the first live position greater than or equal to `position`.
+        """
+        return self.select(self.rank(max(position, 0)))
+
+    def kth_live_after(self, position: int, k: int) -> Optional[int]:
+        """
+        Finds the k-th live position (0-based) at or after `position`.
+        """
+        return self.select(self.rank(max(position, 0)) + k)
+
+
+def live_index_for(dataset: Sequence) -> LiveIndex:
+    """
+    Creates an index with every row of `dataset` live, viewing the one
+    published beside a shared dataset instead of building it when there
+    is one.
+    """
+    published = published_arrays(dataset)
+    if ("live", "flags") not in published:
+        return LiveIndex(len(dataset))
+    live = LiveIndex(published=published)
+    # Rows appended to the dataset since it was published.
+    while len(live) < len(dataset):
+        live.append()
+    return live
+
+
+class IndexedDataset(MutableMapping):
+    """
+    Mapping of stable row position to row, backed by the dataset itself
+    and a `LiveIndex` instead of a dict holding every row.
+
+    Deleting a key only clears its live flag; assigning to a deleted or
+    new trailing position makes it live again.
+    """
+
+    def __init__(self, dataset: Sequence, live: Optional[LiveIndex] = None):
+        """
+        Args:
+            dataset (Sequence): The rows, by position.
+            live (LiveIndex): An existing index of the live rows to share,
+                e.g. a hypermedia server's; a new one with every row live
+                is created when omitted.
+        """
+        self.dataset = dataset
+        self.live = live_index_for(dataset) if live is None else live
+        # Rows assigned after load, by position.
+        self.__overrides: Dict[int, List] = {}
+
+    @property
+    def span(self) -> int:
+        """
+        Returns the number of positions, live or deleted.
+        """
+        return len(self.live)
+
+    def __row(self, position: int) -> List:
+        row = self.__overrides.get(position)
+        return self.dataset[position] if row is None else row
+
+    def __getitem__(self, position: int) -> List:
+        if not self.live.is_live(position):
+            raise KeyError(position)
+        return self.__row(position)
+
+    def get(self, position: int, default=None):
+        if not self.live.is_live(position):
+            return default
+        return self.__row(position)
+
+    def __contains__(self, position) -> bool:
+        return isinstance(position, int) and self.live.is_live(position)
+
+    def __setitem__(self, position: int, row: List) -> None:
+        assert isinstance(position, int) and position >= 0, \
+            "Position must be a non-negative integer."
+        while len(self.live) < position:
+            self.live.append(live=False)
+        if position == len(self.live):
+            self.live.append()
+        else:
+            self.live.insert(position)
+        self.__overrides[position] = row
+
+    def __delitem__(self, position: int) -> None:
+        if not self.live.delete(position):
+            raise KeyError(position)
+        self.__overrides.pop(position, None)
+
+    def __iter__(self) -> Iterator[int]:
+        position = self.live.next_live(0)
+        while position is not None:
+            yield position
+            position = self.live.next_live(position + 1)
+
+    def __len__(self) -> int:
+        return self.live.live_count
+
+    def extend(self, rows: Sequence[List]) -> None:
+        """
+        Appends rows as new live positions, storing them in the dataset
+        itself when it is writable and grows in step with the index, and
+        as overrides otherwise.
+        """
+        writable = is_writable(self.dataset)
+        for row in rows:
+            if writable and len(self.dataset) == self.span:
+                # Store the row before making it visible to readers.
+                self.dataset.append(row)
+                self.live.append()
+            else:
+                self[self.span] = row
+
+    def page(self, position: int,
+             page_size: int) -> Tuple[List[List], int]:
+        """
+        Collects up to `page_size` live rows starting at `position`.
+
+        Returns:
+            Tuple[List[List], int]: The rows and the position just after the
+            last one returned.
+        """
+        data = []
+        start = self.live.rank(position)
+        end = position
+        for k in range(page_size):
+            current = self.live.select(start + k)
+            if current is None:
+                break
+            data.append(self.__row(current))
+            end = current + 1
+        return data, end
+
+    def hyper_index(self, index: Optional[int],
+                    page_size: int) -> Tuple[Dict, int]:
+        """
+        Builds a deletion-resilient `get_hyper_index` response.
+
+        Args:
+            index (int): The starting position, 0 if omitted.
+            page_size (int): The number of rows per page.
+
+        Returns:
+            Tuple[Dict, int]: The response and the position just after
+            the last row returned.
+        """
+        if index is None:
+            index = 0
+        assert isinstance(index, int) and 0 <= index < self.span, \
+            "Index out of range."
+
+        # Collect up to `page_size` live rows; deleted positions are skipped
+        # through the live index instead of one key at a time.
+        data, end = self.page(index, page_size)
+
+        # The next index is the position after the last row returned, as
+        # long as any live row remains from there on.
+        return {
+            'index': index,
+            'data': data,
+            'page_size': len(data),
+            'next_index': end if self.live.next_live(end) is not None
+            else None,
+        }, end
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped, row-offset indexed view of a CSV dataset.
+"""
+import csv
+import io
+import mmap
+from array import array
+from typing import List, Union
+
+
+class MappedDataset:
+    """
+    Read-only sequence of CSV rows backed by a memory-mapped file.
+
+    Only the byte offset of each row is kept in memory; rows are parsed
+    on access, so indexing or slicing touches just the requested bytes.
+    """
+
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        """
+        Maps the file at `path` and builds the row-offset index.
+
+        Args:
+            path (str): Path to the CSV file.
+            encoding (str): Text encoding of the file.
+        """
+        self.path = path
+        self.encoding = encoding
+        self.__file = open(path, "rb")
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files; an empty buffer behaves the same.
+            self.__map = b""
+        self.__offsets = self.__build_offsets()
+
+    def __row_end(self, pos: int) -> int:
+        """
+        Finds the offset just past the row starting at `pos`: after the
+        first line break outside a quoted field, or the end of the file.
+        """
+        buf = self.__map
+        size = len(buf)
+        quotes = 0
+        while True:
+            nl = buf.find(b"\n", pos)
+            end = size if nl == -1 else nl
+            # Rows without quotes, the common case, need no counting.
+            if buf.find(b'"', pos, end) != -1:
+                quotes += buf[pos:end].count(b'"')
+            if nl == -1 or quotes % 2 == 0:
+                return size if nl == -1 else nl + 1
+            # The line break is inside a quoted field; keep going.
+            pos = nl + 1
+
+    def __build_offsets(self) -> array:
+        """
+        Scans the mapped file for line breaks and records where each data
+        row starts, followed by one final entry for the end of the data.
+        Line breaks inside quoted fields do not end a row.
+
+        Returns:
+            array: Unsigned 64-bit byte offsets, one per row plus one.
+        """
+        size = len(self.__map)
+        offsets = array("Q")
+
+        # Skip the header row.
+        pos = self.__row_end(0) if size else 0
+        while pos < size:
+            offsets.append(pos)
+            pos = self.__row_end(pos)
+        offsets.append(size)
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self.__offsets) - 1
+
+    @property
+    def source_size(self) -> int:
+        """
+        Returns how many bytes of the file were mapped and indexed.
+        """
+        return self.__offsets[-1]
+
+    def __parse(self, start: int, end: int) -> List[List]:
+        """
+        Parses the rows stored between two byte offsets.
+        """
+        text = self.__map[start:end].decode(self.encoding)
+        return list(csv.reader(io.StringIO(text, newline="")))
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[List, List[List]]:
+        """
+        Returns one parsed row, or a list of parsed rows for a slice.
+        """
+        length = len(self)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            return self.__parse(self.__offsets[start], self.__offsets[stop])
+
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError("MappedDataset index out of range")
+        return self.__parse(self.__offsets[key], self.__offsets[key + 1])[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self) -> None:
+        """
+        Releases the memory map and the underlying file handle.
+        """
+        if isinstance(self.__map, mmap.mmap):
+            self.__map.close()
+        self.__file.close()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Optional instrumentation for the pagination servers.
+
+A server given `metrics=None` (the default) skips every measurement behind
+a single attribute check. Any object with `increment` and `observe`
+methods like `MetricsRegistry` can be passed instead, e.g. an adapter to
+StatsD; the registry keeps everything in memory and renders it in the
+Prometheus text exposition format.
+
+Metrics recorded by the servers:
+
+    load_seconds{server, stage}: dataset and index load times.
+    request_seconds{method}: latency of each public page method.
+    rows_returned_total{method}, rows_scanned_total{method}: rows in the
+        responses, and row positions visited to build them; the difference
+        is the deleted rows skipped.
+    page_cache_requests_total{result}: `get_hyper` page cache hits and
+        misses.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds, in seconds, of the default latency histogram buckets.
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Counts observations into fixed cumulative buckets.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus one for values above the last bound.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Adds one observation.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        Returns (upper bound, observations at or below it) pairs, ending
+        with "+Inf".
+        """
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (None,), self.counts):
+            total += count
+            pairs.append(("+Inf" if bound is None else repr(bound), total))
+        return pairs
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n") \
+        .replace('"', '\\"')
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, _escape(value))
+                          for name, value in labels) + "}"
+
+
+def timed(metrics, name: str, call: Callable[[], T], **labels) -> T:
+    """
+    Runs `call`, recording its duration in seconds as `name` unless
+    `metrics` is None.
+    """
+    if metrics is None:
+        return call()
+    started = time.perf_counter()
+    result = call()
+    metrics.observe(name, time.perf_counter() - started, **labels)
+    return result
+
+
+def record_page(metrics, method: str, started: float, returned: int,
+                scanned: Optional[int] = None) -> None:
+    """
+    Records one page request: its latency since `started`, a
+    `time.perf_counter()` reading, and the rows it returned. `scanned` is
+    the number of row positions visited, if known; those not returned are
+    deleted rows that had to be skipped.
+    """
+    metrics.observe("request_seconds", time.perf_counter() - started,
+                    method=method)
+    if scanned is not None:
+        metrics.increment("rows_scanned_total", scanned, method=method)
+    metrics.increment("rows_returned_total", returned, method=method)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-memory store of counters and histograms.
+
+    Series are keyed by metric name and label values, so label values
+    should come from a small fixed set such as method names.
+    """
+
+    def __init__(self, namespace: str = "pagination",
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Args:
+            namespace (str): Prefix of every rendered metric name.
+            buckets (Sequence[float]): Histogram bucket upper bounds.
+        """
+        self.namespace = namespace
+        self.buckets = buckets
+        self.__counters: Dict[str, Dict[Tuple, float]] = {}
+        self.__histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self.__lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Adds `value` to a counter.
+        """
+        key = tuple(sorted(labels.items()))
+        with self.__lock:
+            series = self.__counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        Records one observation, e.g. a duration in seconds, in a
+        histogram.
+        """
+        key = tuple(sorted(labels.items()))
+        with self.__lock:
+            series = self.__histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        """
+        Returns the current value of a counter, 0 if never incremented.
+        """
+        with self.__lock:
+            return self.__counters.get(name, {}).get(
+                tuple(sorted(labels.items())), 0)
+
+    def histogram(self, name: str, **labels) -> Tuple[int, float]:
+        """
+        Returns the number and sum of observations in a histogram.
+        """
+        with self.__lock:
+            histogram = self.__histograms.get(name, {}).get(
+                tuple(sorted(labels.items())))
+            if histogram is None:
+                return (0, 0.0)
+            return (histogram.count, histogram.sum)
+
+    def render(self) -> str:
+        """
+        Renders every series in the Prometheus text exposition format.
+        """
+        lines = []
+        with self.__lock:
+            for name in sorted(self.__counters):
+                full = "{}_{}".format(self.namespace, name)
+                lines.append("# TYPE {} counter".format(full))
+                for key, value in sorted(self.__counters[name].items()):
+                    lines.append("{}{} {}".format(full, _labels(key),
+                                                  repr(float(value))))
+            for name in sorted(self.__histograms):
+                full = "{}_{}".format(self.namespace, name)
+                lines.append("# TYPE {} histogram".format(full))
+                series = self.__histograms[name]
+                for key in sorted(series):
+                    histogram = series[key]
+                    for bound, count in histogram.cumulative():
+                        lines.append("{}_bucket{} {}".format(
+                            full, _labels(key + (("le", bound),)), count))
+                    lines.append("{}_sum{} {}".format(
+                        full, _labels(key), repr(histogram.sum)))
+                    lines.append("{}_count{} {}".format(
+                        full, _labels(key), histogram.count))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Size-bounded LRU cache with optional TTL for hypermedia page responses.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+# Rough per-row and per-entry overhead used to estimate entry sizes.
+ROW_OVERHEAD = 64
+ENTRY_OVERHEAD = 256
+
+
+def response_size(response: Dict) -> int:
+    """
+    Estimates the memory held by a `get_hyper` response in bytes.
+    """
+    size = ENTRY_OVERHEAD
+    for row in response.get("data", ()):
+        size += ROW_OVERHEAD + sum(len(field) for field in row)
+    return size
+
+
+def copy_response(response: Dict) -> Dict:
+    """
+    Copies a response down to its rows, so the copy can be changed
+    without affecting the original or other copies.
+    """
+    copy = dict(response)
+    if "data" in copy:
+        copy["data"] = [list(row) for row in copy["data"]]
+    return copy
+
+
+def _freeze(response: Dict) -> Dict:
+    # Stores the rows as tuples, which no caller can change in place.
+    frozen = dict(response)
+    if "data" in frozen:
+        frozen["data"] = tuple(tuple(row) for row in frozen["data"])
+    return frozen
+
+
+class PageCache:
+    """
+    Least-recently-used cache bounded by entry count and/or estimated
+    bytes, whose entries may also expire after `ttl` seconds.
+
+    Hits, misses, evictions and invalidations are counted for monitoring.
+    Responses are copied in and out, rows included, so changing a
+    response never changes what later hits return.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = None,
+                 ttl: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries (int): Maximum number of cached pages.
+            max_bytes (int): Maximum estimated size of all cached pages.
+            ttl (float): Seconds after which an entry expires.
+            clock (Callable): Time source, in seconds.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __drop(self, key: Hashable) -> None:
+        _, size, _ = self.__entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """
+        Returns a copy of the cached response for `key`, or None.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.ttl is not None and \
+                    self.clock() - entry[2] > self.ttl:
+                self.__drop(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+        return copy_response(entry[0])
+
+    def put(self, key: Hashable, response: Dict) -> None:
+        """
+        Caches `response`, evicting least recently used entries to stay
+        within the configured bounds.
+        """
+        size = response_size(response)
+        frozen = _freeze(response)
+        with self.__lock:
+            if key in self.__entries:
+                self.__drop(key)
+            self.__entries[key] = (frozen, size, self.clock())
+            self.bytes += size
+            while self.__entries and (
+                    len(self.__entries) > self.max_entries or
+                    (self.max_bytes is not None and
+                     self.bytes > self.max_bytes)):
+                self.__drop(next(iter(self.__entries)))
+                self.evictions += 1
+
+    def invalidate(self, stale: Callable[[Hashable], bool]) -> int:
+        """
+        Drops every entry whose key `stale` returns True for.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        with self.__lock:
+            keys = [key for key in self.__entries if stale(key)]
+            for key in keys:
+                self.__drop(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """
+        Drops every entry.
+        """
+        self.invalidate(lambda key: True)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the cache counters and current size.
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self.__entries),
+                "bytes": self.bytes,
+            }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Constant-time page-range planning, one page or many at a time.
+"""
+from typing import List, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batches fall back to Python.
+    np = None
+
+# Largest offset a plan may reach, so bounds always fit a signed 64-bit int.
+MAX_OFFSET = 2 ** 63 - 1
+
+# Start and end offsets for a batch of pages.
+Bounds = Tuple[Sequence[int], Sequence[int]]
+
+
+def index_range(page: int, page_size: int) -> Tuple[int, int]:
+    """
+    Calculate the start and end index for a
+    given page in pagination, in constant time.
+
+    Args:
+        page (int): The current page number (1-based).
+        page_size (int): The number of items per page.
+
+    Returns:
+        Tuple[int, int]: A tuple with the start and
+        end indices for the items on the requested page,
+        (0, 0) for pages before the first.
+
+    Raises:
+        AssertionError: If the arguments are not integers or the range
+            would not fit in a signed 64-bit integer.
+    """
+    assert isinstance(page, int) and isinstance(page_size, int), \
+        "Page and page size must be integers."
+    if page < 1:
+        return (0, 0)
+    end = page * page_size
+    assert abs(end) <= MAX_OFFSET, "Page range too large."
+    return (end - page_size, end)
+
+
+def plan_page(page: int, page_size: int, limit: int) -> Tuple[int, int]:
+    """
+    Like `index_range`, but clamps both bounds to `limit` rows so pages
+    past the end come back empty instead of as huge offsets.
+    """
+    assert page_size >= 1, "Page size must be a positive integer."
+    if page < 1:
+        return (0, 0)
+    if page > limit // page_size + 1:
+        return (limit, limit)
+    start = min((page - 1) * page_size, limit)
+    return (start, start + min(page_size, limit - start))
+
+
+def _clip(values: Union[int, Sequence[int]]) -> Union[int, Sequence[int]]:
+    """
+    Clamps Python ints to [0, MAX_OFFSET] so they convert to int64; pages
+    below 1 stay below 1 and sizes below 1 stay invalid.
+    """
+    if isinstance(values, int):
+        return min(max(values, 0), MAX_OFFSET)
+    if np is not None and isinstance(values, np.ndarray):
+        return values
+    return [min(max(value, 0), MAX_OFFSET) for value in values]
+
+
+def index_ranges(pages: Sequence[int], page_sizes: Union[int, Sequence[int]],
+                 limit: int = MAX_OFFSET) -> Bounds:
+    """
+    Plans many pages at once, e.g. for prefetchers and bulk requests.
+
+    Uses vectorized NumPy arithmetic when NumPy is installed and a plain
+    loop otherwise. Pages before the first map to (0, 0) and every bound
+    is clamped to `limit`, so oversized pages cannot overflow.
+
+    Args:
+        pages (Sequence[int]): 1-based page numbers.
+        page_sizes (Union[int, Sequence[int]]): One page size for all pages
+            or one per page, each at least 1.
+        limit (int): Number of rows available.
+
+    Returns:
+        Tuple[Sequence[int], Sequence[int]]: Start and end offsets, as
+        int64 arrays with NumPy and lists without it.
+    """
+    if np is None:
+        if isinstance(page_sizes, int):
+            page_sizes = [page_sizes] * len(pages)
+        bounds = [plan_page(page, size, limit)
+                  for page, size in zip(pages, page_sizes)]
+        return ([start for start, _ in bounds], [end for _, end in bounds])
+
+    # Pages or sizes past int64 would make np.asarray raise OverflowError;
+    # clamped to MAX_OFFSET they still plan to (limit, limit).
+    pages = np.asarray(_clip(pages), dtype=np.int64)
+    sizes = np.broadcast_to(np.asarray(_clip(page_sizes), dtype=np.int64),
+                            pages.shape)
+    assert (sizes >= 1).all(), "Page sizes must be positive integers."
+    limit = np.int64(min(limit, MAX_OFFSET))
+    # Pages that start at or past `limit` are clamped before multiplying,
+    # which keeps every product within int64.
+    last_page = limit // sizes + 1
+    clipped = np.clip(pages, 1, last_page)
+    starts = np.where(pages > last_page, limit, (clipped - 1) * sizes)
+    ends = starts + np.minimum(sizes, limit - starts)
+    before_first = pages < 1
+    starts[before_first] = 0
+    ends[before_first] = 0
+    return starts, ends
+
+
+def plan_slices(pages: Sequence[int], page_sizes: Union[int, Sequence[int]],
+                limit: int = MAX_OFFSET) -> List[slice]:
+    """
+    Plans many pages at once as slice objects for direct indexing.
+    """
+    starts, ends = index_ranges(pages, page_sizes, limit)
+    return [slice(int(start), int(end)) for start, end in zip(starts, ends)]
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Secondary indexes for filtered and sorted pagination of the dataset.
+"""
+import bisect
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dataset_storage import published_arrays
+from live_index import LiveIndex
+
+# Position of each filterable or sortable column in a dataset row.
+COLUMNS = {
+    "year": 0,
+    "gender": 1,
+    "ethnicity": 2,
+    "name": 3,
+    "count": 4,
+    "rank": 5,
+}
+FILTER_COLUMNS = ("year", "gender", "ethnicity", "name")
+SORT_COLUMNS = ("count", "rank")
+# Number of distinct filtered results kept for paging through, and the
+# most bytes of row ids they may hold together.
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_BYTES = 64 << 20
+
+Predicate = Tuple[Tuple[str, str], ...]
+
+
+def normalize_filters(filters: Optional[Dict] = None) -> Predicate:
+    """
+    Turns a filter dict into a hashable, order-independent predicate.
+
+    Args:
+        filters (Dict): Column name to required value. Supported keys are
+            "year", "gender", "ethnicity", "name" and "name_prefix".
+
+    Returns:
+        Predicate: Sorted (key, value) pairs with values as strings.
+    """
+    if not filters:
+        return ()
+    for key in filters:
+        assert key in FILTER_COLUMNS or key == "name_prefix", \
+            "Unknown filter: {}".format(key)
+    return tuple(sorted((key, str(value)) for key, value in filters.items()
+                        if value is not None))
+
+
+def matches(row: List, predicate: Predicate) -> bool:
+    """
+    Checks whether `row` satisfies every filter in `predicate`.
+    """
+    for key, value in predicate:
+        if key == "name_prefix":
+            if not row[COLUMNS["name"]].casefold().startswith(
+                    value.casefold()):
+                return False
+        elif row[COLUMNS[key]] != value:
+            return False
+    return True
+
+
+def _common(smallest: Sequence[int],
+            others: List[Sequence[int]]) -> Iterator[int]:
+    """
+    Yields the ids of `smallest` found in every other sorted row-id list,
+    probing the larger lists with bisect.
+    """
+    for row_id in smallest:
+        for other in others:
+            i = bisect.bisect_left(other, row_id)
+            if i == len(other) or other[i] != row_id:
+                break
+        else:
+            yield row_id
+
+
+def _intersect(smallest: Sequence[int],
+               others: List[Sequence[int]]) -> array:
+    """
+    Intersects sorted row-id lists.
+    """
+    return array("I", _common(smallest, others))
+
+
+class Reversed(Sequence):
+    """
+    Read-only view of a row-id array in reverse order, so descending
+    sorts page through the ascending order without copying it.
+    """
+
+    def __init__(self, row_ids: Sequence[int]):
+        self.row_ids = row_ids
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def __getitem__(self, key):
+        size = len(self.row_ids)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(size)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return self.row_ids[:0]
+            return self.row_ids[size - stop:size - start][::-1]
+        if key < 0:
+            key += size
+        if not 0 <= key < size:
+            raise IndexError("Reversed index out of range")
+        return self.row_ids[size - 1 - key]
+
+
+def _own(arrays: Dict, key: str) -> array:
+    """
+    Returns arrays[key], first copying it into a private array if it is a
+    view into shared memory, which is read-only.
+    """
+    values = arrays[key]
+    if isinstance(values, memoryview):
+        values = arrays[key] = array(values.format, values)
+    return values
+
+
+class SecondaryIndexes:
+    """
+    Posting lists per column value, a case-insensitive name-prefix lookup
+    and pre-sorted row permutations for the numeric columns, all built in
+    one pass over the dataset and kept current through `add`/`remove`.
+
+    A dataset attached from shared memory comes with the arrays already
+    built (see `arrays()`); they are viewed in place, and each one is
+    copied only when a change first touches it.
+    """
+
+    def __init__(self, dataset: Sequence, live: Optional[LiveIndex] = None):
+        """
+        Args:
+            dataset (Sequence): The rows to index.
+            live (LiveIndex): Rows that are not live in it are skipped.
+        """
+        self.dataset = dataset
+        self.__results: OrderedDict = OrderedDict()
+        self.__result_bytes = 0
+        published = published_arrays(dataset)
+        if ("order", SORT_COLUMNS[0]) in published:
+            self.__adopt(published, live)
+        else:
+            self.__build(live)
+
+    def __index_names(self) -> None:
+        """
+        Sorts the distinct names by their case-folded form, for prefixes.
+        """
+        self.names = sorted((name.casefold(), name)
+                            for name in self.postings["name"])
+        self.name_keys = [key for key, _ in self.names]
+
+    def __build(self, live: Optional[LiveIndex]) -> None:
+        """
+        Indexes every live row of the dataset.
+        """
+        dataset = self.dataset
+        self.postings: Dict[str, Dict[str, Sequence[int]]] = {
+            column: {} for column in FILTER_COLUMNS
+        }
+        keys: Dict[str, array] = {column: array("q")
+                                  for column in SORT_COLUMNS}
+        row_ids = array("I")
+        for row_id, row in enumerate(dataset):
+            if not row or (live is not None and not live.is_live(row_id)):
+                continue
+            row_ids.append(row_id)
+            for column in FILTER_COLUMNS:
+                value = row[COLUMNS[column]]
+                posting = self.postings[column].get(value)
+                if posting is None:
+                    posting = self.postings[column][value] = array("I")
+                posting.append(row_id)
+            for column in SORT_COLUMNS:
+                keys[column].append(int(row[COLUMNS[column]]))
+
+        # keys[column][row_id] is the row's numeric value; order[column]
+        # lists row ids by ascending value, ties in file order.
+        self.keys: Dict[str, Sequence[int]] = keys
+        self.order: Dict[str, Sequence[int]] = {}
+        for column in SORT_COLUMNS:
+            values = keys[column]
+            self.order[column] = array("I", (row_ids[i] for i in sorted(
+                range(len(values)), key=values.__getitem__)))
+            # Skipped rows have no value; give every row id a slot.
+            if len(row_ids) != len(dataset):
+                full = array("q", [0]) * len(dataset)
+                for i, row_id in enumerate(row_ids):
+                    full[row_id] = values[i]
+                keys[column] = full
+        self.__index_names()
+
+    def __adopt(self, published: Dict, live: Optional[LiveIndex]) -> None:
+        """
+        Takes the published arrays, then brings them up to date with the
+        rows appended or deleted since they were built.
+        """
+        self.postings = {column: {} for column in FILTER_COLUMNS}
+        self.keys, self.order = {}, {}
+        for name, values in published.items():
+            if name[0] == "postings":
+                self.postings[name[1]][name[2]] = values
+            elif name[0] == "keys":
+                self.keys[name[1]] = values
+            elif name[0] == "order":
+                self.order[name[1]] = values
+        self.__index_names()
+        size = len(self.keys[SORT_COLUMNS[0]])
+        if live is not None and live.live_count < len(live):
+            for row_id in range(size):
+                row = self.dataset[row_id]
+                if row and not live.is_live(row_id):
+                    self.remove(row_id, row)
+        for row_id in range(size, len(self.dataset)):
+            row = self.dataset[row_id]
+            if row and (live is None or live.is_live(row_id)):
+                self.add(row_id, row)
+
+    def arrays(self) -> Dict[Tuple[str, ...], array]:
+        """
+        Exports the posting lists, sort keys and sort orders by name, for
+        publishing next to a shared dataset. The keys cover every row id.
+        """
+        arrays = {}
+        for column, postings in self.postings.items():
+            for value, posting in postings.items():
+                arrays[("postings", column, value)] = posting
+        for column in SORT_COLUMNS:
+            keys = self.keys[column]
+            arrays[("keys", column)] = keys + array(
+                "q", [0]) * (len(self.dataset) - len(keys))
+            arrays[("order", column)] = self.order[column]
+        return arrays
+
+    def names_with_prefix(self, prefix: str) -> List[str]:
+        """
+        Returns the distinct names starting with `prefix`, ignoring case.
+        """
+        key = prefix.casefold()
+        start = bisect.bisect_left(self.name_keys, key)
+        end = bisect.bisect_left(self.name_keys, key + "\U0010ffff")
+        return [name for _, name in self.names[start:end]]
+
+    def __candidates(self, predicate: Predicate) -> List[Sequence[int]]:
+        """
+        Collects one sorted row-id list per filter in `predicate`.
+        """
+        lists = []
+        for key, value in predicate:
+            if key == "name_prefix":
+                merged = []
+                for name in self.names_with_prefix(value):
+                    merged.extend(self.postings["name"][name])
+                merged.sort()
+                lists.append(array("I", merged))
+            else:
+                lists.append(self.postings[key].get(value, ()))
+        return lists
+
+    def count(self, filters: Optional[Dict] = None) -> int:
+        """
+        Counts the rows matching `filters` without materializing them,
+        or from the cached result of a matching query.
+        """
+        predicate = normalize_filters(filters)
+        if not predicate:
+            return len(self.order[SORT_COLUMNS[0]])
+        result = self.__results.get((predicate, None))
+        if result is not None:
+            return len(result)
+        lists = sorted(self.__candidates(predicate), key=len)
+        if len(lists) == 1:
+            return len(lists[0])
+        return sum(1 for _ in _common(lists[0], lists[1:]))
+
+    def query(self, filters: Optional[Dict] = None,
+              sort: Optional[str] = None) -> Optional[Sequence[int]]:
+        """
+        Finds the row ids matching `filters`, in the requested order.
+
+        Intersections and sorted results are cached per predicate, so
+        paging through one query only pays for the lookup on its first
+        page. A single equality filter returns its posting list as is and
+        a descending sort a reversed view, neither of them copied.
+
+        Args:
+            filters (Dict): See `normalize_filters`.
+            sort (str): "count" or "rank", prefixed with "-" for
+                descending order; file order when omitted.
+
+        Returns:
+            Optional[Sequence[int]]: Matching row ids, or None when neither
+            filters nor sort are given and the raw file order applies.
+            They may be the index's own arrays; do not modify them.
+        """
+        predicate = normalize_filters(filters)
+        descending = bool(sort) and sort.startswith("-")
+        column = sort[1:] if descending else sort
+        assert column is None or column in SORT_COLUMNS, \
+            "Unknown sort: {}".format(sort)
+        if not predicate and column is None:
+            return None
+
+        if not predicate:
+            order = self.order[column]
+            return Reversed(order) if descending else order
+        lists = sorted(self.__candidates(predicate), key=len)
+        if len(lists) == 1 and column is None:
+            return lists[0]
+
+        key = (predicate, sort)
+        result = self.__results.get(key)
+        if result is not None:
+            self.__results.move_to_end(key)
+            return result
+
+        if len(lists) == 1:
+            result = array("I", lists[0])
+        else:
+            result = _intersect(lists[0], lists[1:])
+        if column is not None:
+            result = array("I", sorted(result,
+                                       key=self.keys[column].__getitem__))
+            if descending:
+                result.reverse()
+        self.__remember(key, result)
+        return result
+
+    def __remember(self, key: Tuple[Predicate, Optional[str]],
+                   result: array) -> None:
+        """
+        Caches `result`, evicting the least recently used results to stay
+        within RESULT_CACHE_SIZE entries and RESULT_CACHE_BYTES.
+        """
+        size = result.itemsize * len(result)
+        if size > RESULT_CACHE_BYTES:
+            return
+        self.__results[key] = result
+        self.__result_bytes += size
+        while len(self.__results) > RESULT_CACHE_SIZE or \
+                self.__result_bytes > RESULT_CACHE_BYTES:
+            _, evicted = self.__results.popitem(last=False)
+            self.__result_bytes -= evicted.itemsize * len(evicted)
+
+    def __order_slot(self, column: str, row_id: int) -> int:
+        """
+        Finds where `row_id` belongs in order[column], by value then id.
+        """
+        keys, order = self.keys[column], self.order[column]
+        target = (keys[row_id], row_id)
+        low, high = 0, len(order)
+        while low < high:
+            mid = (low + high) // 2
+            if (keys[order[mid]], order[mid]) < target:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def __forget(self, row: List) -> None:
+        """
+        Drops the cached results whose predicate matches `row`.
+        """
+        for key in [key for key in self.__results
+                    if matches(row, key[0])]:
+            evicted = self.__results.pop(key)
+            self.__result_bytes -= evicted.itemsize * len(evicted)
+
+    def add(self, row_id: int, row: List) -> None:
+        """
+        Indexes a row appended to the dataset at `row_id`.
+        """
+        for column in FILTER_COLUMNS:
+            value = row[COLUMNS[column]]
+            postings = self.postings[column]
+            if value in postings:
+                posting = _own(postings, value)
+            else:
+                posting = postings[value] = array("I")
+                if column == "name":
+                    entry = (value.casefold(), value)
+                    i = bisect.bisect_left(self.names, entry)
+                    self.names.insert(i, entry)
+                    self.name_keys.insert(i, entry[0])
+            posting.insert(bisect.bisect_left(posting, row_id), row_id)
+        for column in SORT_COLUMNS:
+            keys = _own(self.keys, column)
+            while len(keys) <= row_id:
+                keys.append(0)
+            keys[row_id] = int(row[COLUMNS[column]])
+            _own(self.order, column).insert(
+                self.__order_slot(column, row_id), row_id)
+        self.__forget(row)
+
+    def remove(self, row_id: int, row: List) -> None:
+        """
+        Removes a deleted row from every index.
+        """
+        for column in FILTER_COLUMNS:
+            posting = self.postings[column].get(row[COLUMNS[column]])
+            if posting is None:
+                continue
+            i = bisect.bisect_left(posting, row_id)
+            if i < len(posting) and posting[i] == row_id:
+                del _own(self.postings[column], row[COLUMNS[column]])[i]
+        for column in SORT_COLUMNS:
+            order = self.order[column]
+            i = self.__order_slot(column, row_id)
+            if i < len(order) and order[i] == row_id:
+                del _own(self.order, column)[i]
+        self.__forget(row)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Columnar dataset shared between worker processes through shared memory.
+
+One loader process publishes the dataset into a named shared-memory
+segment (in the snapshot layout), together with its secondary indexes
+and live index; every `Server` created with the "shared" storage
+attaches to it read-only, viewing the column and index bytes in place
+instead of holding or building its own copy.
+
+Usage: ./shared_dataset.py Popular_Baby_Names.csv
+"""
+import hashlib
+import os
+import signal
+import sys
+import weakref
+from array import array
+from typing import Dict, List
+
+from columnar_dataset import ColumnarDataset
+from snapshot import decode_dataset, encode_dataset, load_snapshot
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python < 3.8
+    resource_tracker = shared_memory = None
+
+
+def segment_name(source: str) -> str:
+    """
+    Derives the shared-memory segment name for the file at `source`.
+    """
+    digest = hashlib.sha1(os.path.abspath(source).encode("utf-8"))
+    return "babynames_" + digest.hexdigest()[:16]
+
+
+def _detach(segment, columns: List, published: Dict) -> None:
+    """
+    Releases the column and index views into `segment`, then unmaps it;
+    the segment cannot be closed while any view is still exported.
+    """
+    views = list(published.values())
+    for column in columns:
+        views += [getattr(column, "values", None),
+                  getattr(column, "codes", None)]
+    for values in views:
+        if isinstance(values, memoryview):
+            values.release()
+    segment.close()
+
+
+class SharedDataset(ColumnarDataset):
+    """
+    Read-only `ColumnarDataset` whose columns are views into a shared
+    memory segment owned by another process.
+
+    `published` holds the index arrays stored in the segment by name (see
+    `dataset_storage.published_arrays`); `SecondaryIndexes` and
+    `LiveIndex` view them instead of building their own.
+
+    The segment is detached by `close()`, or else when the dataset is
+    garbage collected or the interpreter exits.
+    """
+
+    writable = False
+
+    def __init__(self, segment, header: List[str], columns: List,
+                 blanks: array = None, published: Dict = None):
+        super().__init__(header, columns, blanks)
+        # Keep the segment mapped for as long as the views are in use.
+        self.segment = segment
+        self.published = published or {}
+        self.__detach = weakref.finalize(self, _detach, segment,
+                                         self.columns, self.published)
+
+    def append(self, row: List) -> None:
+        raise TypeError("A shared dataset is read-only.")
+
+    def close(self) -> None:
+        """
+        Detaches from the segment; the dataset is unusable afterwards.
+        """
+        self.__detach()
+
+
+def publish(source: str, name: str = None):
+    """
+    Loads `source`, indexes it and copies both into a new shared-memory
+    segment, so attached workers build no indexes of their own.
+
+    The caller owns the segment: keep the returned object alive while
+    workers run, then call its `close()` and `unlink()`.
+
+    Args:
+        source (str): Path to the CSV file.
+        name (str): Segment name; derived from `source` when omitted.
+
+    Returns:
+        SharedMemory: The published segment.
+    """
+    assert shared_memory is not None, "Shared memory needs Python 3.8+."
+    # Imported here: the index modules import dataset_storage, which
+    # imports this module.
+    from live_index import LiveIndex
+    from secondary_index import SecondaryIndexes
+
+    dataset = load_snapshot(source)
+    arrays = SecondaryIndexes(dataset).arrays()
+    arrays.update(LiveIndex(len(dataset)).arrays())
+    chunks = encode_dataset(dataset, arrays=arrays)
+    size = sum(len(chunk) for chunk in chunks)
+    segment = shared_memory.SharedMemory(name=name or segment_name(source),
+                                         create=True, size=size)
+    offset = 0
+    for chunk in chunks:
+        segment.buf[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return segment
+
+
+def attach(source: str, name: str = None) -> SharedDataset:
+    """
+    Attaches to the segment published for `source`.
+
+    Raises:
+        FileNotFoundError: If no segment has been published.
+        ValueError: If the segment does not hold a valid dataset.
+    """
+    assert shared_memory is not None, "Shared memory needs Python 3.8+."
+    segment = shared_memory.SharedMemory(name=name or segment_name(source))
+    # Attaching registers the segment with this process's resource
+    # tracker, which would unlink it on exit; only the publisher may.
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    decoded = decode_dataset(segment.buf.toreadonly(), copy=False)
+    if decoded is None:
+        segment.close()
+        raise ValueError("Segment {} is not a dataset.".format(segment.name))
+    meta, dataset = decoded
+    shared = SharedDataset(segment, dataset.header, dataset.columns,
+                           dataset.blanks, meta["arrays"])
+    shared.source_size = dataset.source_size
+    return shared
+
+
+def load_shared(source: str) -> ColumnarDataset:
+    """
+    Attaches to the published dataset for `source`, falling back to a
+    private copy when nothing has been published.
+    """
+    if shared_memory is None:
+        return load_snapshot(source)
+    try:
+        return attach(source)
+    except FileNotFoundError:
+        return load_snapshot(source)
+
+
+def main() -> None:
+    """
+    Publishes a dataset and keeps it available until interrupted.
+    """
+    if len(sys.argv) != 2:
+        sys.exit("Usage: {} DATA_FILE".format(sys.argv[0]))
+    segment = publish(sys.argv[1])
+    print("Published {} ({} bytes)".format(segment.name, segment.size))
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Versioned binary snapshots of the parsed dataset.
+
+A snapshot stores a `ColumnarDataset` as raw typed-array bytes next to the
+CSV it was built from, so a new process can load it without running
+`csv.reader` again. Snapshots are ignored once the source file's size,
+modification time or (optionally) SHA-256 digest no longer match.
+
+Usage: ./snapshot.py [--verify-hash] Popular_Baby_Names.csv ...
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from columnar_dataset import ColumnarDataset, DictColumn, IntColumn
+
+MAGIC = b"BNSNAP"
+FORMAT_VERSION = 3
+SUFFIX = ".snapshot"
+# Column data starts on multiples of this many bytes.
+ALIGNMENT = 8
+# Magic, format version and length of the JSON metadata block.
+PREAMBLE = struct.Struct("<6sHI")
+
+
+def snapshot_path(source: str) -> str:
+    """
+    Returns the path of the snapshot kept next to `source`.
+    """
+    return source + SUFFIX
+
+
+def file_digest(path: str) -> str:
+    """
+    Computes the SHA-256 hex digest of a file in 1 MiB chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(source: str, with_hash: bool = True) -> Dict:
+    """
+    Describes the current state of `source` for invalidation checks.
+
+    Args:
+        source (str): Path to the CSV file.
+        with_hash (bool): Whether to include the SHA-256 digest.
+
+    Returns:
+        Dict: The file size, modification time and optionally its digest.
+    """
+    stat = os.stat(source)
+    info = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        info["sha256"] = file_digest(source)
+    return info
+
+
+def _padding(offset: int) -> int:
+    """
+    Returns how many bytes bring `offset` up to a multiple of ALIGNMENT.
+    """
+    return -offset % ALIGNMENT
+
+
+def encode_dataset(dataset: ColumnarDataset, source_info: Dict = None,
+                   arrays: Dict[Tuple[str, ...], array] = None) -> List[bytes]:
+    """
+    Serializes `dataset` into the snapshot layout: a preamble, JSON
+    metadata, then the raw bytes of every column and of any extra
+    arrays, each aligned to ALIGNMENT bytes so they can be viewed in
+    place.
+
+    Args:
+        dataset (ColumnarDataset): The parsed dataset.
+        source_info (Dict): Fingerprint of the source file, if any.
+        arrays (Dict[Tuple[str, ...], array]): Extra typed arrays stored
+            after the columns, by name, e.g. prebuilt indexes.
+
+    Returns:
+        List[bytes]: Chunks to write out in order.
+    """
+    columns = []
+    for column in dataset.columns:
+        if isinstance(column, IntColumn):
+            columns.append({"kind": "int", "typecode": column.values.typecode,
+                            "length": len(column.values)})
+        else:
+            columns.append({"kind": "dict", "typecode": column.codes.typecode,
+                            "length": len(column.codes),
+                            "values": column.values})
+    meta = json.dumps({
+        "source": source_info,
+        "byteorder": sys.byteorder,
+        "header": dataset.header,
+        "columns": columns,
+        "blanks": list(dataset.blanks),
+        "source_size": dataset.source_size,
+        "arrays": [{"name": list(name), "typecode": values.typecode,
+                    "length": len(values)}
+                   for name, values in (arrays or {}).items()],
+    }).encode("utf-8")
+    meta += b" " * _padding(PREAMBLE.size + len(meta))
+
+    chunks = [PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(meta)), meta]
+    for column in dataset.columns:
+        values = column.values if isinstance(column, IntColumn) \
+            else column.codes
+        data = values.tobytes()
+        chunks.append(data + b"\0" * _padding(len(data)))
+    for values in (arrays or {}).values():
+        data = values.tobytes()
+        chunks.append(data + b"\0" * _padding(len(data)))
+    return chunks
+
+
+def _read_array(view: memoryview, offset: int, spec: Dict,
+                copy: bool) -> Tuple[Optional[Sequence], int]:
+    """
+    Reads the array described by `spec` at `offset`.
+
+    Returns:
+        Tuple[Optional[Sequence], int]: The values, or None if `view`
+        ends first, and the aligned offset of the next array.
+    """
+    end = offset + spec["length"] * array(spec["typecode"]).itemsize
+    if end > len(view):
+        return None, offset
+    if copy:
+        values = array(spec["typecode"])
+        values.frombytes(view[offset:end])
+    else:
+        values = view[offset:end].cast(spec["typecode"])
+    return values, end + _padding(end)
+
+
+def decode_dataset(buffer,
+                   copy: bool = True) -> Optional[Tuple[Dict,
+                                                        ColumnarDataset]]:
+    """
+    Parses a buffer laid out by `encode_dataset`.
+
+    Args:
+        buffer: A bytes-like object holding the snapshot.
+        copy (bool): Copy the columns into arrays. When False, columns are
+            typed memoryviews into `buffer`, which must then stay alive.
+
+    Returns:
+        Optional[Tuple[Dict, ColumnarDataset]]: The metadata and dataset,
+        or None if the buffer is corrupt or from another format version.
+        The metadata's "arrays" maps the name of each extra array to its
+        values, copied or viewed like the columns.
+    """
+    view = memoryview(buffer)
+    if len(view) < PREAMBLE.size:
+        return None
+    magic, version, meta_len = PREAMBLE.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    try:
+        meta = json.loads(bytes(view[PREAMBLE.size:PREAMBLE.size + meta_len]))
+    except ValueError:
+        return None
+    if meta["byteorder"] != sys.byteorder:
+        return None
+
+    offset = PREAMBLE.size + meta_len
+    columns = []
+    for spec in meta["columns"]:
+        values, offset = _read_array(view, offset, spec, copy)
+        if values is None:
+            return None
+        if spec["kind"] == "int":
+            columns.append(IntColumn(values))
+        else:
+            columns.append(DictColumn(
+                values, [sys.intern(value) for value in spec["values"]]))
+    arrays = {}
+    for spec in meta.get("arrays", ()):
+        values, offset = _read_array(view, offset, spec, copy)
+        if values is None:
+            return None
+        arrays[tuple(spec["name"])] = values
+    meta["arrays"] = arrays
+    dataset = ColumnarDataset(meta["header"], columns,
+                              array("Q", meta["blanks"]))
+    dataset.source_size = meta.get("source_size")
+    return meta, dataset
+
+
+def write_snapshot(dataset: ColumnarDataset, source: str,
+                   source_info: Dict = None) -> str:
+    """
+    Atomically writes `dataset` as the snapshot of `source`.
+
+    Args:
+        dataset (ColumnarDataset): The parsed dataset.
+        source (str): Path to the CSV file the dataset was parsed from.
+        source_info (Dict): Fingerprint taken before parsing; computed
+            now when omitted.
+
+    Returns:
+        str: Path of the written snapshot.
+    """
+    if source_info is None:
+        source_info = fingerprint(source)
+    path = snapshot_path(source)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in encode_dataset(dataset, source_info):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def read_snapshot(source: str,
+                  verify_hash: bool = False) -> Optional[ColumnarDataset]:
+    """
+    Loads the snapshot of `source` if it exists and is still fresh.
+
+    Args:
+        source (str): Path to the CSV file.
+        verify_hash (bool): Also compare the SHA-256 digest of `source`,
+            not just its size and modification time.
+
+    Returns:
+        Optional[ColumnarDataset]: The dataset, or None if the snapshot is
+        missing, stale, corrupt or from another format version.
+    """
+    try:
+        with open(snapshot_path(source), "rb") as f:
+            blob = f.read()
+    except OSError:
+        return None
+    decoded = decode_dataset(blob)
+    if decoded is None:
+        return None
+    meta, dataset = decoded
+
+    current = fingerprint(source, with_hash=verify_hash)
+    stored = meta["source"] or {}
+    if any(stored.get(key) != value for key, value in current.items()):
+        return None
+    return dataset
+
+
+def build_snapshot(source: str) -> ColumnarDataset:
+    """
+    Parses `source` and writes a fresh snapshot of it.
+
+    Returns:
+        ColumnarDataset: The parsed dataset.
+    """
+    # Fingerprint before parsing so a concurrent write makes it stale.
+    source_info = fingerprint(source)
+    dataset = ColumnarDataset.from_csv(source)
+    write_snapshot(dataset, source, source_info)
+    return dataset
+
+
+def load_snapshot(source: str) -> ColumnarDataset:
+    """
+    Loads `source` from its snapshot, rebuilding the snapshot when it is
+    missing or stale. Failing to write the snapshot is not an error.
+    """
+    dataset = read_snapshot(source)
+    if dataset is not None:
+        return dataset
+    try:
+        return build_snapshot(source)
+    except OSError:
+        return ColumnarDataset.from_csv(source)
+
+
+def main() -> None:
+    """
+    Pre-builds snapshots, e.g. as a deploy step.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build binary snapshots of CSV datasets.")
+    parser.add_argument("sources", nargs="+", help="CSV files to snapshot")
+    parser.add_argument("--verify-hash", action="store_true",
+                        help="rebuild unless the SHA-256 digest matches")
+    args = parser.parse_args()
+    for source in args.sources:
+        if read_snapshot(source, verify_hash=args.verify_hash) is not None:
+            print("{}: up to date".format(snapshot_path(source)))
+            continue
+        dataset = build_snapshot(source)
+        print("{}: {} rows".format(snapshot_path(source), len(dataset)))
+
+
+if __name__ == "__main__":
+    main()
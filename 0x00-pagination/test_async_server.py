@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for async_server.py: what runs on the event loop and what runs in
+the executor.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from async_server import AsyncServer
+from metrics import MetricsRegistry
+
+HEADER = "Year of Birth,Gender,Ethnicity,Child's First Name,Count,Rank\n"
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """
+    Thread pool that counts the calls submitted to it.
+    """
+
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.calls = 0
+
+    def submit(self, *args, **kwargs):
+        self.calls += 1
+        return super().submit(*args, **kwargs)
+
+
+class AsyncServerTest(unittest.TestCase):
+    """
+    Indexed pages stay off the loop until the indexed view exists.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "names.csv")
+        with open(path, "w") as f:
+            f.write(HEADER)
+            for i in range(50):
+                f.write("2016,FEMALE,HISPANIC,Name{},{},{}\n".format(i, i, i))
+        self.executor = CountingExecutor()
+        self.metrics = MetricsRegistry()
+        self.server = AsyncServer(executor=self.executor,
+                                  metrics=self.metrics)
+        self.server.pages.DATA_FILE = path
+
+    def tearDown(self):
+        self.executor.shutdown()
+        shutil.rmtree(self.directory)
+
+    def test_hyper_index_inline_once_indexed(self):
+        async def scenario():
+            await self.server.ready()
+            loads = self.executor.calls
+            self.assertFalse(self.server.pages.is_indexed())
+            first = await self.server.get_hyper_index(0, 5)
+            self.assertEqual(self.executor.calls, loads + 1)
+            self.assertTrue(self.server.pages.is_indexed())
+            second = await self.server.get_hyper_index(5, 5)
+            self.assertEqual(self.executor.calls, loads + 1)
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first["next_index"], 5)
+        self.assertEqual(second["data"][0][3], "Name5")
+        self.assertEqual(self.metrics.counter(
+            "rows_returned_total", method="get_hyper_index"), 10)
+        self.assertEqual(self.metrics.counter(
+            "rows_scanned_total", method="get_hyper_index"), 10)
+        self.assertEqual(self.metrics.histogram(
+            "request_seconds", method="get_hyper_index")[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
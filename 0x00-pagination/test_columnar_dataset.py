@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for columnar_dataset.py and the stores built on it, checked
+against the plain list loader.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import parallel_loader
+from columnar_dataset import ColumnarDataset, DictColumn, IntColumn
+from dataset_storage import load_dataset
+from snapshot import decode_dataset, encode_dataset
+
+HEADER = "Year of Birth,Gender,Ethnicity,Child's First Name,Count,Rank\n"
+ROWS = [
+    "2016,FEMALE,HISPANIC,Olivia,172,1\n",
+    "\n",
+    '2016,FEMALE,HISPANIC,"Zoë, ""Jo""",12,40\n',
+    "2011,MALE,ASIAN,Liam,007,3\n",
+    "\n",
+    "2012,MALE,ASIAN,Liam,99999999999,2\n",
+    "2012,FEMALE,HISPANIC,Emma,5,x\n",
+]
+
+
+class ColumnarDatasetTest(unittest.TestCase):
+    """
+    Columnar stores return the same rows, at the same positions, as the
+    list loader.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "names.csv")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(HEADER + "".join(ROWS * 3))
+        self.expected = load_dataset(self.path, "list")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_matches_list_loader(self):
+        self.assertEqual(self.expected.count([]), 6)
+        for storage in ("columnar", "snapshot", "shared", "mmap",
+                        "parallel", "parallel-columnar"):
+            dataset = load_dataset(self.path, storage)
+            self.assertEqual(len(dataset), len(self.expected), storage)
+            self.assertEqual(list(dataset), self.expected, storage)
+            self.assertEqual(dataset[1:5], self.expected[1:5], storage)
+            self.assertEqual(dataset[-3], self.expected[-3], storage)
+
+    def test_parallel_chunks(self):
+        with mock.patch.object(parallel_loader, "MIN_PARALLEL_SIZE", 0):
+            for columnar in (False, True):
+                dataset = parallel_loader.load_parallel(self.path, 3,
+                                                        columnar)
+                self.assertEqual(list(dataset), self.expected, columnar)
+
+    def test_column_encodings(self):
+        dataset = ColumnarDataset.from_csv(self.path)
+        kinds = [type(column) for column in dataset.columns]
+        self.assertEqual(kinds, [IntColumn, DictColumn, DictColumn,
+                                 DictColumn, DictColumn, DictColumn])
+        self.assertEqual(dataset.columns[0].values.typecode, "i")
+        self.assertEqual(list(dataset.blanks), [1, 4, 8, 11, 15, 18])
+
+    def test_append_and_extend(self):
+        dataset = ColumnarDataset.from_csv(self.path)
+        extra = ColumnarDataset.from_rows(dataset.header, [
+            [], ["2019", "MALE", "BLACK", "Noah", "1", "1"],
+            ["2019", "FEMALE", "WHITE", "Ava", "2", "2"], []])
+        dataset.extend(extra)
+        dataset.append([])
+        dataset.append(["2020", "MALE", "BLACK", "Noah", "3", "4"])
+        expected = self.expected + list(extra) + [
+            [], ["2020", "MALE", "BLACK", "Noah", "3", "4"]]
+        self.assertEqual(list(dataset), expected)
+        with self.assertRaises(AssertionError):
+            dataset.append(["2020", "MALE"])
+
+    def test_snapshot_round_trip(self):
+        dataset = ColumnarDataset.from_csv(self.path)
+        blob = b"".join(encode_dataset(dataset))
+        for copy in (True, False):
+            _, decoded = decode_dataset(blob, copy)
+            self.assertEqual(list(decoded), self.expected)
+        self.assertIsNone(decode_dataset(blob[:40]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for count_cache.py, checked against counting the rows directly.
+"""
+import random
+import unittest
+
+from count_cache import CountCache
+from secondary_index import SecondaryIndexes, matches, normalize_filters
+from test_secondary_index import YEARS, random_filters, random_row
+
+
+class CountCacheTest(unittest.TestCase):
+    """
+    Cached counts stay exact as rows are added and removed.
+    """
+
+    def test_counts_follow_changes(self):
+        rng = random.Random(11)
+        rows = [random_row(rng) for _ in range(300)]
+        live = set(range(len(rows)))
+        indexes = SecondaryIndexes(rows)
+        counts = CountCache(indexes)
+        queries = [random_filters(rng) for _ in range(40)]
+
+        def check():
+            for filters in queries:
+                predicate = normalize_filters(filters)
+                expected = sum(1 for i in live if matches(rows[i], predicate))
+                self.assertEqual(counts.count(filters), expected, filters)
+
+        check()
+        for _ in range(100):
+            if rng.random() < 0.5:
+                row_id = rng.choice(sorted(live))
+                indexes.remove(row_id, rows[row_id])
+                counts.remove(rows[row_id])
+                live.discard(row_id)
+            else:
+                rows.append(random_row(rng))
+                live.add(len(rows) - 1)
+                indexes.add(len(rows) - 1, rows[-1])
+                counts.add(rows[-1])
+        check()
+        self.assertEqual(counts.total(), len(live))
+
+    def test_estimates(self):
+        rng = random.Random(2)
+        rows = [random_row(rng) for _ in range(300)]
+        counts = CountCache(SecondaryIndexes(rows))
+        # A single equality filter is always exact.
+        self.assertEqual(counts.estimate({"year": 2016}),
+                         sum(1 for row in rows if row[0] == "2016"))
+        # An exact count, once known, replaces the estimate.
+        filters = {"year": 2016, "gender": "MALE"}
+        exact = counts.count(filters)
+        self.assertEqual(counts.estimate(filters), exact)
+        self.assertEqual(counts.estimate(), len(rows))
+        self.assertEqual(CountCache(SecondaryIndexes([])).estimate(
+            {"year": 2016}), 0)
+
+    def test_bounded(self):
+        rng = random.Random(3)
+        rows = [random_row(rng) for _ in range(50)]
+        counts = CountCache(SecondaryIndexes(rows), size=2)
+        for year in YEARS:
+            counts.count({"year": year, "gender": "MALE"})
+        rows.append(["2011", "MALE", "HISPANIC", "Emma", "1", "1"])
+        counts.indexes.add(len(rows) - 1, rows[-1])
+        counts.add(rows[-1])
+        self.assertEqual(counts.count({"year": 2011, "gender": "MALE"}),
+                         sum(1 for row in rows
+                             if row[:2] == ["2011", "MALE"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for cursor.py and cursor pagination on the deletion-resilient
+server.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from cursor import (VERSION_PREFIX, CursorError, DatasetVersion,
+                    decode_cursor, encode_cursor)
+
+Server = __import__('3-hypermedia_del_pagination').Server
+
+HEADER = "Year of Birth,Gender,Ethnicity,Child's First Name,Count,Rank\n"
+
+
+def write_rows(path: str, first: int, count: int, mode: str = "a") -> None:
+    with open(path, mode) as f:
+        if mode == "w":
+            f.write(HEADER)
+        for i in range(first, first + count):
+            f.write("2016,FEMALE,HISPANIC,Name{},{},{}\n".format(i, i, i))
+
+
+class CursorTest(unittest.TestCase):
+    """
+    Cursors round-trip and reject anything they were not issued for.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "names.csv")
+        write_rows(self.path, 0, 100, "w")
+        self.version = DatasetVersion(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        token = encode_cursor(42, self.version, b"secret")
+        self.assertEqual(decode_cursor(token, self.version, b"secret"), 42)
+
+    def test_rejects_tampering(self):
+        token = encode_cursor(42, self.version, b"secret")
+        with self.assertRaises(CursorError):
+            decode_cursor(token, self.version, b"other")
+        payload, signature = token.split(".")
+        forged = encode_cursor(43, self.version, b"secret").split(".")[0]
+        with self.assertRaises(CursorError):
+            decode_cursor(forged + "." + signature, self.version, b"secret")
+        for malformed in ("", "abc", "a.b.c", None, payload + ".!!"):
+            with self.assertRaises(CursorError):
+                decode_cursor(malformed, self.version, b"secret")
+
+    def test_version_survives_appends(self):
+        token = encode_cursor(5, self.version, b"secret")
+        write_rows(self.path, 100, 5000)
+        later = DatasetVersion(self.path)
+        self.assertEqual(decode_cursor(token, later, b"secret"), 5)
+        self.assertEqual(decode_cursor(encode_cursor(6, later, b"secret"),
+                                       self.version, b"secret"), 6)
+        self.assertLess(len(self.version.prefix), VERSION_PREFIX)
+        self.assertEqual(len(later.prefix), VERSION_PREFIX)
+
+    def test_identical_copy_keeps_version(self):
+        copy = os.path.join(self.directory, "copy.csv")
+        shutil.copyfile(self.path, copy)
+        os.replace(copy, self.path)
+        copied = DatasetVersion(self.path)
+        self.assertEqual(copied.token, self.version.token)
+        self.assertEqual(decode_cursor(encode_cursor(5, self.version,
+                                                     b"secret"),
+                                       copied, b"secret"), 5)
+
+    def test_rewrite_changes_version(self):
+        replacement = self.path + ".new"
+        write_rows(replacement, 1, 100, "w")
+        os.replace(replacement, self.path)
+        rewritten = DatasetVersion(self.path)
+        self.assertFalse(rewritten.accepts(self.version.token))
+        self.assertFalse(self.version.accepts(rewritten.token))
+        with self.assertRaises(CursorError):
+            decode_cursor(encode_cursor(5, self.version, b"secret"),
+                          rewritten, b"secret")
+
+    def test_rewrite_in_place_changes_version(self):
+        with open(self.path, "r+") as f:
+            f.seek(len(HEADER))
+            f.write("2017")
+        self.assertFalse(self.version.accepts(
+            DatasetVersion(self.path).token))
+
+
+class CursorServerTest(unittest.TestCase):
+    """
+    Cursor pages on the deletion-resilient server.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "names.csv")
+        write_rows(self.path, 0, 2500, "w")
+        self.server = Server()
+        self.server.DATA_FILE = self.path
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_pages_skip_deleted_rows(self):
+        page = self.server.get_page_by_cursor(None, 10)
+        del self.server.indexed_dataset()[10]
+        page = self.server.get_page_by_cursor(page['next_cursor'], 2)
+        self.assertEqual([row[3] for row in page['data']],
+                         ["Name11", "Name12"])
+
+    def test_cursor_from_another_worker(self):
+        token = self.server.get_page_by_cursor(None, 10)['next_cursor']
+        other = Server()
+        other.DATA_FILE = self.path
+        self.assertEqual(other.get_page_by_cursor(token, 1)['data'][0][3],
+                         "Name10")
+
+    def test_export_survives_append(self):
+        rows = 0
+        for _ in self.server.iter_rows(chunk_size=1000):
+            rows += 1
+            if rows == 1500:
+                write_rows(self.path, 2500, 1)
+        self.assertEqual(rows, 2500)
+        token = self.server.cursor_for(2499)
+        self.assertEqual(self.server.refresh(), 1)
+        self.assertEqual(
+            [row[3] for row in self.server.get_page_by_cursor(token)['data']],
+            ["Name2499", "Name2500"])
+
+    def test_iter_pages_resumes(self):
+        pages = list(self.server.iter_pages(page_size=1000))
+        self.assertEqual([page['index'] for page in pages], [0, 1000, 2000])
+        self.assertIsNone(pages[-1]['next_index'])
+        resumed = list(self.server.iter_pages(
+            self.server.cursor_for(pages[0]['next_index']), 1000))
+        self.assertEqual(resumed, pages[1:])
+
+    def test_old_worker_rejects_rewritten_file(self):
+        token = self.server.get_page_by_cursor(None, 10)['next_cursor']
+        replacement = self.path + ".new"
+        write_rows(replacement, 1, 2500, "w")
+        os.replace(replacement, self.path)
+        fresh = Server()
+        fresh.DATA_FILE = self.path
+        with self.assertRaises(CursorError):
+            fresh.get_page_by_cursor(token)
+        with self.assertRaises(CursorError):
+            self.server.get_page_by_cursor(
+                fresh.get_page_by_cursor(None, 10)['next_cursor'])
+        with self.assertRaises(AssertionError):
+            self.server.refresh()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests that get_hyper_json is byte-identical to encoding get_hyper.
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from page_cache import PageCache
+
+Server = __import__('2-hypermedia_pagination').Server
+
+NAMES = ("Olivia", "Zoë", "Chloé", 'Ana "Jo"', "Liam\\", "Ümit")
+
+
+class HyperJsonTest(unittest.TestCase):
+    """
+    get_hyper_json(...) == json.dumps(get_hyper(...)).encode().
+    """
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "names.csv")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("Year of Birth,Gender,Ethnicity,Child's First Name,"
+                    "Count,Rank\n")
+            for _ in range(250):
+                f.write('{},{},HISPANIC,"{}",{},{}\n'.format(
+                    rng.choice((2011, 2016)), rng.choice(("FEMALE", "MALE")),
+                    rng.choice(NAMES).replace('"', '""'),
+                    rng.randrange(1, 99), rng.randrange(1, 30)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def server(self, **kwargs) -> Server:
+        server = Server(**kwargs)
+        server.DATA_FILE = self.path
+        return server
+
+    def assert_identical(self, server: Server) -> None:
+        for page, page_size in ((1, 10), (3, 7), (25, 10), (26, 10),
+                                (1, 1000), (10 ** 18, 10)):
+            for filters, sort in ((None, None), ({"year": 2016}, None),
+                                  ({"name_prefix": "z"}, "-count"),
+                                  (None, "rank"), ({"name": "nobody"}, None)):
+                expected = json.dumps(server.get_hyper(
+                    page, page_size, filters, sort)).encode()
+                self.assertEqual(server.get_hyper_json(
+                    page, page_size, filters, sort), expected,
+                    (page, page_size, filters, sort))
+
+    def test_identical(self):
+        self.assert_identical(self.server())
+
+    def test_identical_with_json_cache(self):
+        server = self.server(json_cache=True)
+        self.assert_identical(server)
+        # Cached fragments must not outlive their rows.
+        for row_id in (0, 5, 6, 100):
+            server.delete_row(row_id)
+        self.assert_identical(server)
+        server.add_row(["2016", "FEMALE", "HISPANIC", "Zoë", "1", "1"])
+        self.assert_identical(server)
+
+    def test_identical_with_page_cache(self):
+        server = self.server(page_cache=PageCache(), json_cache=True)
+        self.assert_identical(server)
+        server.delete_row(3)
+        self.assert_identical(server)
+
+    def test_exact_totals(self):
+        server = self.server()
+        for filters in ({"year": 2016, "gender": "MALE"},
+                        {"name_prefix": "o", "year": 2011}):
+            matched = len(server.matching_rows(filters))
+            total_pages = -(-matched // 5)
+            info = server.get_hyper(total_pages, 5, filters)
+            self.assertEqual(info["total_pages"], total_pages)
+            self.assertIsNone(info["next_page"])
+            self.assertEqual(server.get_hyper(total_pages - 1, 5,
+                                              filters)["next_page"],
+                             total_pages)
+            self.assertEqual(server.row_count(filters), matched)
+
+
+if __name__ == "__main__":
+    unittest.main()
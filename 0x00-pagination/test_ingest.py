@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for ingest.py and for `refresh()` on every plain-file storage.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from dataset_storage import load_dataset, source_size
+from ingest import FileTail
+
+HyperServer = __import__('2-hypermedia_pagination').Server
+DeletionServer = __import__('3-hypermedia_del_pagination').Server
+
+HEADER = "Year of Birth,Gender,Ethnicity,Child's First Name,Count,Rank\n"
+STORAGES = ("list", "mmap", "columnar", "snapshot", "shared", "parallel",
+            "parallel-columnar")
+
+
+def row_line(i: int) -> str:
+    return "2016,FEMALE,HISPANIC,Name{},{},{}\n".format(i, i, i)
+
+
+class IngestTest(unittest.TestCase):
+    """
+    Appended rows are read once, from where the loader stopped.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "names.csv")
+        self.write(HEADER + row_line(0) + "\n" + row_line(1), "w")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text: str, mode: str = "a") -> None:
+        with open(self.path, mode) as f:
+            f.write(text)
+
+    def test_loaders_record_where_parsing_ended(self):
+        size = os.path.getsize(self.path)
+        for storage in STORAGES:
+            dataset = load_dataset(self.path, storage)
+            self.assertEqual(len(dataset), 3, storage)
+            self.assertEqual(source_size(dataset), size, storage)
+
+    def test_reads_only_complete_lines(self):
+        tail = FileTail(self.path, os.path.getsize(self.path))
+        self.assertEqual(tail.read_rows(), [])
+        self.write(row_line(2) + "\n2016,MALE")
+        self.assertEqual([row[3] if row else None
+                          for row in tail.read_rows()], ["Name2", None])
+        self.write(",HISPANIC,Liam,1,1\n")
+        self.assertEqual(tail.read_rows(),
+                         [["2016", "MALE", "HISPANIC", "Liam", "1", "1"]])
+        self.assertEqual(tail.read_rows(), [])
+
+    def test_unterminated_last_row(self):
+        self.write(row_line(2).rstrip("\n"))
+        tail = FileTail(self.path, os.path.getsize(self.path))
+        self.assertEqual(tail.read_rows(), [])
+        self.write("\n" + row_line(3))
+        self.assertEqual([row[3] for row in tail.read_rows()], ["Name3"])
+
+    def test_refresh_every_storage(self):
+        for storage in STORAGES:
+            self.write(HEADER + row_line(0) + "\n" + row_line(1), "w")
+            servers = (HyperServer(storage), DeletionServer(storage))
+            for server in servers:
+                server.DATA_FILE = self.path
+                server.dataset()
+            self.write(row_line(2))
+            for server in servers:
+                self.assertEqual(server.refresh(), 1, storage)
+                self.assertEqual(server.refresh(), 0, storage)
+            hyper, deletion = servers
+            self.assertEqual(hyper.get_page(1, 10)[1:], [
+                [], row_line(1).rstrip().split(","),
+                row_line(2).rstrip().split(",")], storage)
+            self.assertEqual(
+                [row[3] for row in hyper.get_hyper(1, 10,
+                                                   {"year": 2016})["data"]],
+                ["Name0", "Name1", "Name2"], storage)
+            self.assertEqual(hyper.add_row(["2011", "MALE", "ASIAN", "Liam",
+                                            "5", "5"]), 4, storage)
+            self.assertEqual(len(deletion.indexed_dataset()), 4, storage)
+            self.assertEqual(deletion.indexed_dataset()[3][3], "Name2",
+                             storage)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for live_index.py, checked against a brute-force model.
+"""
+import random
+import unittest
+
+from live_index import IndexedDataset, LiveIndex
+
+
+class LiveIndexTest(unittest.TestCase):
+    """
+    LiveIndex answers like a plain list of live flags.
+    """
+
+    def assert_matches(self, index: LiveIndex, flags: list) -> None:
+        live = [i for i, flag in enumerate(flags) if flag]
+        self.assertEqual(len(index), len(flags))
+        self.assertEqual(index.live_count, len(live))
+        for position in range(len(flags) + 2):
+            self.assertEqual(index.rank(position),
+                             sum(flags[:position]))
+            self.assertEqual(index.is_live(position),
+                             position < len(flags) and flags[position])
+            following = [i for i in live if i >= position]
+            self.assertEqual(index.next_live(position),
+                             following[0] if following else None)
+            for k in (0, 1, 3):
+                self.assertEqual(index.kth_live_after(position, k),
+                                 following[k] if k < len(following)
+                                 else None)
+        for k in range(len(live) + 2):
+            self.assertEqual(index.select(k),
+                             live[k] if k < len(live) else None)
+        self.assertIsNone(index.select(-1))
+
+    def test_empty(self):
+        index = LiveIndex()
+        self.assert_matches(index, [])
+        self.assertEqual(index.append(), 0)
+        self.assert_matches(index, [True])
+
+    def test_random_operations(self):
+        rng = random.Random(4)
+        for size in (0, 1, 2, 7, 64, 100):
+            index = LiveIndex(size)
+            flags = [True] * size
+            for _ in range(300):
+                operation = rng.random()
+                if operation < 0.4 and flags:
+                    position = rng.randrange(len(flags))
+                    self.assertEqual(index.delete(position), flags[position])
+                    flags[position] = False
+                elif operation < 0.7 and flags:
+                    position = rng.randrange(len(flags))
+                    self.assertEqual(index.insert(position),
+                                     not flags[position])
+                    flags[position] = True
+                else:
+                    live = rng.random() < 0.8
+                    self.assertEqual(index.append(live), len(flags))
+                    flags.append(live)
+            self.assert_matches(index, flags)
+
+    def test_out_of_range(self):
+        index = LiveIndex(3)
+        self.assertFalse(index.delete(3))
+        self.assertFalse(index.delete(-1))
+        self.assertFalse(index.insert(3))
+        self.assertFalse(index.insert(0))
+
+
+class IndexedDatasetTest(unittest.TestCase):
+    """
+    IndexedDataset behaves like a dict of position to row.
+    """
+
+    def setUp(self):
+        self.rows = [[str(i)] for i in range(50)]
+
+    def test_mapping_against_dict(self):
+        rng = random.Random(7)
+        dataset = IndexedDataset(list(self.rows))
+        model = dict(enumerate(self.rows))
+        for _ in range(200):
+            position = rng.randrange(60)
+            if rng.random() < 0.6:
+                if position in model:
+                    del dataset[position]
+                    del model[position]
+                else:
+                    with self.assertRaises(KeyError):
+                        del dataset[position]
+            else:
+                row = ["new", str(position)]
+                dataset[position] = row
+                model[position] = row
+        self.assertEqual(len(dataset), len(model))
+        self.assertEqual(list(dataset), sorted(model))
+        self.assertEqual(dict(dataset.items()), model)
+
+    def test_page_skips_deleted_rows(self):
+        dataset = IndexedDataset(self.rows)
+        for position in (1, 2, 3, 7):
+            del dataset[position]
+        data, end = dataset.page(0, 4)
+        self.assertEqual(data, [["0"], ["4"], ["5"], ["6"]])
+        self.assertEqual(end, 7)
+        data, end = dataset.page(end, 2)
+        self.assertEqual(data, [["8"], ["9"]])
+        self.assertEqual(dataset.page(60, 5), ([], 60))
+
+    def test_hyper_index(self):
+        dataset = IndexedDataset(self.rows)
+        del dataset[2]
+        response, end = dataset.hyper_index(None, 3)
+        self.assertEqual(response, {
+            'index': 0,
+            'data': [["0"], ["1"], ["3"]],
+            'page_size': 3,
+            'next_index': 4,
+        })
+        self.assertEqual(end, 4)
+        for position in range(45, 50):
+            del dataset[position]
+        response, _ = dataset.hyper_index(40, 10)
+        self.assertEqual(len(response['data']), 5)
+        self.assertIsNone(response['next_index'])
+        with self.assertRaises(AssertionError):
+            dataset.hyper_index(50, 10)
+
+    def test_extend_writable_dataset(self):
+        rows = list(self.rows)
+        dataset = IndexedDataset(rows)
+        dataset.extend([["50"], ["51"]])
+        self.assertEqual(len(rows), 52)
+        self.assertEqual(dataset[51], ["51"])
+        self.assertEqual(dataset.span, 52)
+
+    def test_extend_read_only_dataset(self):
+        rows = tuple(self.rows)
+        dataset = IndexedDataset(rows)
+        dataset.extend([["50"], ["51"]])
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(dataset[50], ["50"])
+        self.assertEqual(dataset.page(49, 5)[0], [["49"], ["50"], ["51"]])
+
+    def test_shared_live_index(self):
+        live = LiveIndex(len(self.rows))
+        dataset = IndexedDataset(self.rows, live)
+        live.delete(0)
+        self.assertNotIn(0, dataset)
+        self.assertEqual(dataset.page(0, 1)[0], [["1"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
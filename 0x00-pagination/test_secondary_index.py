@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for secondary_index.py, checked against filtering and sorting
+the rows directly.
+"""
+import random
+import unittest
+from unittest import mock
+
+import secondary_index
+from live_index import LiveIndex
+from secondary_index import SecondaryIndexes, matches, normalize_filters
+
+YEARS = ("2011", "2012", "2016")
+GENDERS = ("FEMALE", "MALE")
+ETHNICITIES = ("HISPANIC", "ASIAN AND PACIFIC ISLANDER")
+NAMES = ("Olivia", "oliver", "Olga", "Emma", "Émile", "Liam")
+
+
+def random_row(rng: random.Random) -> list:
+    return [rng.choice(YEARS), rng.choice(GENDERS), rng.choice(ETHNICITIES),
+            rng.choice(NAMES), str(rng.randrange(1, 50)),
+            str(rng.randrange(1, 20))]
+
+
+def random_filters(rng: random.Random) -> dict:
+    filters = {}
+    if rng.random() < 0.5:
+        filters["year"] = int(rng.choice(YEARS))
+    if rng.random() < 0.5:
+        filters["gender"] = rng.choice(GENDERS)
+    if rng.random() < 0.3:
+        filters["ethnicity"] = rng.choice(ETHNICITIES)
+    if rng.random() < 0.3:
+        filters["name"] = rng.choice(NAMES)
+    elif rng.random() < 0.3:
+        filters["name_prefix"] = rng.choice(("ol", "OL", "É", "x", ""))
+    return filters
+
+
+class SecondaryIndexesTest(unittest.TestCase):
+    """
+    Queries return the matching live row ids in the requested order.
+    """
+
+    def setUp(self):
+        self.rng = random.Random(6)
+        self.rows = [random_row(self.rng) for _ in range(300)]
+        self.live = set(range(len(self.rows)))
+
+    def expected(self, filters, sort=None) -> list:
+        predicate = normalize_filters(filters)
+        row_ids = [i for i in sorted(self.live)
+                   if matches(self.rows[i], predicate)]
+        if sort:
+            column = {"count": 4, "rank": 5}[sort.lstrip("-")]
+            row_ids.sort(key=lambda i: int(self.rows[i][column]))
+            if sort.startswith("-"):
+                row_ids.reverse()
+        return row_ids
+
+    def assert_queries(self, indexes: SecondaryIndexes) -> None:
+        for _ in range(100):
+            filters = random_filters(self.rng)
+            sort = self.rng.choice((None, "count", "-count", "rank"))
+            self.assertEqual(indexes.count(filters),
+                             len(self.expected(filters)), filters)
+            result = indexes.query(filters, sort)
+            if not normalize_filters(filters) and sort is None:
+                self.assertIsNone(result)
+                continue
+            expected = self.expected(filters, sort)
+            self.assertEqual(list(result), expected, (filters, sort))
+            self.assertEqual(list(result[3:9]), expected[3:9])
+            self.assertEqual(list(result[-4:]), expected[-4:])
+
+    def test_queries(self):
+        self.assert_queries(SecondaryIndexes(self.rows))
+
+    def test_skips_deleted_rows_at_build(self):
+        live = LiveIndex(len(self.rows))
+        for row_id in range(0, len(self.rows), 3):
+            live.delete(row_id)
+            self.live.discard(row_id)
+        self.assert_queries(SecondaryIndexes(self.rows, live))
+
+    def test_add_and_remove(self):
+        indexes = SecondaryIndexes(self.rows)
+        self.assert_queries(indexes)
+        for _ in range(100):
+            if self.rng.random() < 0.5:
+                row_id = self.rng.choice(sorted(self.live))
+                indexes.remove(row_id, self.rows[row_id])
+                self.live.discard(row_id)
+            else:
+                row = random_row(self.rng)
+                if self.rng.random() < 0.2:
+                    row[3] = "Zoë{}".format(len(self.rows))
+                self.rows.append(row)
+                self.live.add(len(self.rows) - 1)
+                indexes.add(len(self.rows) - 1, row)
+        self.assert_queries(indexes)
+
+    def test_results_share_or_bound_memory(self):
+        indexes = SecondaryIndexes(self.rows)
+        self.assertIs(indexes.query({"year": 2016}),
+                      indexes.postings["year"]["2016"])
+        self.assertIs(indexes.query(None, "-rank").row_ids,
+                      indexes.order["rank"])
+        # Results evicted to stay within the byte budget are rebuilt.
+        with mock.patch.object(secondary_index, "RESULT_CACHE_BYTES", 400):
+            self.assert_queries(indexes)
+            self.assert_queries(indexes)
+
+    def test_names_with_prefix(self):
+        indexes = SecondaryIndexes(self.rows)
+        self.assertEqual(indexes.names_with_prefix("OL"),
+                         ["Olga", "oliver", "Olivia"])
+        self.assertEqual(indexes.names_with_prefix("zz"), [])
+
+    def test_unknown_filter_or_sort(self):
+        indexes = SecondaryIndexes(self.rows)
+        with self.assertRaises(AssertionError):
+            indexes.query({"colour": "red"})
+        with self.assertRaises(AssertionError):
+            indexes.query(None, "name")
+
+
+if __name__ == "__main__":
+    unittest.main()
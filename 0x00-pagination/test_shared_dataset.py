@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for shared_dataset.py: workers view the published columns and
+indexes in place, and copy an index array only when they change it.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import shared_dataset
+from dataset_storage import AppendOverlay
+from live_index import live_index_for
+from secondary_index import SecondaryIndexes
+
+HyperServer = __import__('2-hypermedia_pagination').Server
+
+HEADER = "Year of Birth,Gender,Ethnicity,Child's First Name,Count,Rank\n"
+QUERIES = [
+    ({"year": 2012}, None),
+    ({"gender": "MALE", "ethnicity": "ASIAN"}, "-count"),
+    ({"name_prefix": "na"}, "rank"),
+    (None, "count"),
+    (None, "-rank"),
+]
+
+
+def row_line(i: int) -> str:
+    return "{},{},{},Name{},{},{}\n".format(
+        2011 + i % 3, ("MALE", "FEMALE")[i % 2],
+        ("ASIAN", "HISPANIC", "WHITE")[i % 3], i % 7, i * 37 % 11, i % 5)
+
+
+@unittest.skipIf(shared_dataset.shared_memory is None,
+                 "Shared memory needs Python 3.8+.")
+class SharedDatasetTest(unittest.TestCase):
+    """
+    Indexes over an attached dataset answer like freshly built ones.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "names.csv")
+        with open(self.path, "w") as f:
+            f.write(HEADER)
+            for i in range(60):
+                f.write("\n" if i % 13 == 5 else row_line(i))
+        self.segment = shared_dataset.publish(self.path)
+        self.shared = self.attach()
+
+    def tearDown(self):
+        self.shared.close()
+        self.segment.close()
+        self.segment.unlink()
+        shutil.rmtree(self.directory)
+
+    def attach(self, load=None):
+        """
+        Attaches like a worker would. Workers unregister the segment from
+        the resource tracker, which here is also the publisher's, so it
+        is registered again for `unlink()`.
+        """
+        dataset = (load or (lambda: shared_dataset.attach(self.path)))()
+        shared_dataset.resource_tracker.register(self.segment._name,
+                                                 "shared_memory")
+        return dataset
+
+    def assertSameQueries(self, indexes, expected):
+        for filters, sort in QUERIES:
+            self.assertEqual(list(indexes.query(filters, sort)),
+                             list(expected.query(filters, sort)),
+                             (filters, sort))
+            self.assertEqual(indexes.count(filters), expected.count(filters))
+
+    def test_indexes_are_views(self):
+        indexes = SecondaryIndexes(self.shared)
+        self.assertIsInstance(indexes.postings["year"]["2011"], memoryview)
+        self.assertIsInstance(indexes.order["count"], memoryview)
+        self.assertSameQueries(indexes, SecondaryIndexes(list(self.shared)))
+        self.assertEqual(indexes.names_with_prefix("NAME1"), ["Name1"])
+
+    def test_changes_copy_on_write(self):
+        dataset = AppendOverlay(self.shared)
+        live = live_index_for(dataset)
+        self.assertEqual(len(live), len(self.shared))
+        indexes = SecondaryIndexes(dataset, live)
+        row = ["2016", "MALE", "ASIAN", "Zed", "3", "1"]
+        dataset.append(row)
+        live.append()
+        indexes.add(len(dataset) - 1, row)
+        live.delete(2)
+        indexes.remove(2, dataset[2])
+
+        expected = list(dataset)
+        expected[2] = []
+        self.assertSameQueries(indexes, SecondaryIndexes(expected))
+        self.assertEqual(live.live_count, len(dataset) - 1)
+        self.assertIsInstance(indexes.postings["year"]["2012"], memoryview)
+
+        # Neither the segment nor another worker's view changed.
+        other = self.attach()
+        try:
+            self.assertSameQueries(SecondaryIndexes(other),
+                                   SecondaryIndexes(list(self.shared)))
+            self.assertEqual(live_index_for(other).live_count, len(other))
+        finally:
+            other.close()
+
+    def test_catch_up_after_attach(self):
+        dataset = AppendOverlay(self.shared)
+        dataset.append(["2013", "FEMALE", "WHITE", "Name3", "4", "2"])
+        live = live_index_for(dataset)
+        live.delete(0)
+        expected = list(dataset)
+        expected[0] = []
+        self.assertSameQueries(SecondaryIndexes(dataset, live),
+                               SecondaryIndexes(expected))
+
+    def test_server(self):
+        server = HyperServer("shared")
+        server.DATA_FILE = self.path
+        self.attach(server.dataset)
+        reference = HyperServer("list")
+        reference.DATA_FILE = self.path
+        for pages in (server, reference):
+            pages.delete_row(3)
+            pages.add_row(["2011", "MALE", "ASIAN", "Name1", "9", "9"])
+        self.assertIsInstance(server.indexes().postings["year"]["2012"],
+                              memoryview)
+        for filters, sort in QUERIES:
+            self.assertEqual(server.get_hyper(1, 50, filters, sort),
+                             reference.get_hyper(1, 50, filters, sort))
+        self.assertEqual(server.indexed_dataset().page(0, 100),
+                         reference.indexed_dataset().page(0, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,13 +2,16 @@
 """
 Flask application with localization and timezone support.
 """
-from flask import Flask, render_template, request, g
+from flask import Flask, Response, render_template, request, g
 from flask_babel import Babel
+from flask_babel import get_locale as current_locale
 from datetime import timezone as tmzn
-from pytz import timezone
-import pytz.exceptions
 from typing import Dict, Union
 
+from negotiation import Negotiator
+from response_cache import ResponseCache
+from selector_cache import ResolutionCache, zone_name
+
 
 class Config(object):
     """
@@ -24,6 +27,15 @@ app = Flask(__name__)
 app.config.from_object(Config)
 babel = Babel(app)
 
+# Selector results per distinct request inputs, and timezone names
+# resolved so far; unknown zones such as "Vulcan" are cached as None.
+resolutions = ResolutionCache()
+zones = ResolutionCache()
+# Supported locales, compiled for constant-time Accept-Language matching.
+negotiator = Negotiator(app.config["LANGUAGES"])
+# Rendered pages per template, locale and user.
+pages = ResponseCache()
+
 
 # User data with locale and timezone preferences
 users = {
@@ -57,46 +69,71 @@ def before_request():
 def get_locale():
     """
     Determines the best language based on query parameters, user settings, or headers.
+    Results are cached per distinct request inputs.
+    """
+    key = ("locale", request.args.get("locale"),
+           request.args.get("login_as"), request.headers.get("locale"),
+           request.headers.get("Accept-Language"))
+    return resolutions.lookup(key, resolve_locale)
+
+
+def resolve_locale():
+    """
+    Picks the locale from the URL, the user, the locale header or the
+    Accept-Language header, in that order.
     """
     locale = request.args.get("locale")
-    if locale in app.config["LANGUAGES"]:
+    if negotiator.is_supported(locale):
         return locale
     if g.user:
         locale = g.user.get("locale")
-        if locale in app.config["LANGUAGES"]:
+        if negotiator.is_supported(locale):
             return locale
     locale = request.headers.get("locale")
-    if locale in app.config["LANGUAGES"]:
+    if negotiator.is_supported(locale):
         return locale
-    return request.accept_languages.best_match(app.config["LANGUAGES"])
+    return negotiator.negotiate(request.headers.get("Accept-Language"))
 
 
 @babel.timezoneselector
 def get_timezone():
     """
     Determines the appropriate timezone from query parameters or user settings.
+    Results are cached per distinct request inputs.
+    """
+    key = ("timezone", request.args.get("timezone"),
+           request.args.get("login_as"))
+    return resolutions.lookup(key, resolve_timezone)
+
+
+def resolve_timezone():
+    """
+    Picks the first valid timezone from the URL or the user, falling
+    back to the default.
     """
     timezone_param = request.args.get("timezone")
     if timezone_param:
-        try:
-            return timezone(timezone_param).zone
-        except pytz.exceptions.UnknownTimeZoneError:
-            pass
+        timezone_param = zones.lookup(timezone_param,
+                                      lambda: zone_name(timezone_param))
+        if timezone_param:
+            return timezone_param
     if g.user:
-        try:
-            timezone_param = g.user.get("timezone")
-            return timezone(timezone_param).zone
-        except pytz.exceptions.UnknownTimeZoneError:
-            pass
+        timezone_param = g.user.get("timezone")
+        timezone_param = zones.lookup(timezone_param,
+                                      lambda: zone_name(timezone_param))
+        if timezone_param:
+            return timezone_param
     return app.config["BABEL_DEFAULT_TIMEZONE"]
 
 
 @app.route("/", strict_slashes=False)
-def index() -> str:
+def index() -> Response:
     """
-    Renders the main page.
+    Renders the main page, or answers from the page cache.
     """
-    return render_template("5-index.html")
+    key = ("5-index.html", str(current_locale()),
+           g.user["name"] if g.user else None)
+    return pages.respond(key, lambda: render_template("5-index.html"))
 
 
 if __name__ == "__main__":
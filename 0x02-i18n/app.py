@@ -2,23 +2,28 @@
 """
 Flask application with localization and timezone support.
 """
-import locale
 from flask import (
     Flask,
+    Response,
     render_template,
     request,
     g
 )
 from flask_babel import Babel
+from flask_babel import get_locale as current_locale
+import os
 from datetime import timezone as tmzn
-from datetime import datetime
-from pytz import timezone
-import pytz.exceptions
 from typing import (
     Dict,
     Union
 )
 
+from catalogs import CatalogManager
+from negotiation import Negotiator
+from response_cache import ResponseCache
+from selector_cache import ResolutionCache, zone_name
+from time_format import format_now
+
 
 class Config(object):
     """
@@ -33,6 +38,20 @@ app = Flask(__name__)
 app.config.from_object(Config)
 babel = Babel(app)
 
+# Selector results per distinct request inputs, and timezone names
+# resolved so far; unknown zones such as "Vulcan" are cached as None.
+resolutions = ResolutionCache()
+zones = ResolutionCache()
+# Supported locales, compiled for constant-time Accept-Language matching.
+negotiator = Negotiator(app.config['LANGUAGES'])
+# Every compiled catalog, loaded at startup and swapped out when its .mo
+# file changes; templates translate through it.
+catalogs = CatalogManager(os.path.join(app.root_path, 'translations'),
+                          current_locale)
+catalogs.install(app)
+# Rendered pages per template, locale, user and catalog generation.
+pages = ResponseCache()
+
 # User data with locale and timezone preferences
 users = {
     1: {"name": "Balou", "locale": "fr", "timezone": "Europe/Paris"},
@@ -60,63 +79,83 @@ def before_request():
     """
     user = get_user()
     g.user = user
-    
-    # Get the current time in the user's timezone
-    time_now = pytz.utc.localize(datetime.utcnow())
-    time = time_now.astimezone(timezone(get_timezone()))
-    
-    # Set the locale for time formatting
-    locale.setlocale(locale.LC_TIME, (get_locale(), 'UTF-8'))
-    
-    # Format time and store in the Flask global object
-    fmt = "%b %d, %Y %I:%M:%S %p"
-    g.time = time.strftime(fmt)
+
+    # Format the current time in the user's locale and timezone with a
+    # cached Babel formatter; unlike locale.setlocale this changes no
+    # process-wide state, so concurrent requests cannot interfere.
+    g.time = format_now(get_locale() or app.config['BABEL_DEFAULT_LOCALE'],
+                        get_timezone())
 
 
 @babel.localeselector
 def get_locale():
     """
     Determines the best language match for the user.
+    Results are cached per distinct request inputs.
+    """
+    key = ('locale', request.args.get('locale'),
+           request.args.get('login_as'), request.headers.get('locale'),
+           request.headers.get('Accept-Language'))
+    return resolutions.lookup(key, resolve_locale)
+
+
+def resolve_locale():
+    """
+    Picks the locale from the URL, the user, the locale header or the
+    Accept-Language header, in that order.
     """
     loc = request.args.get('locale')
-    if loc in app.config['LANGUAGES']:
+    if negotiator.is_supported(loc):
         return loc
     if g.user:
         loc = g.user.get('locale')
-        if loc in app.config['LANGUAGES']:
+        if negotiator.is_supported(loc):
             return loc
     loc = request.headers.get('locale')
-    if loc in app.config['LANGUAGES']:
+    if negotiator.is_supported(loc):
         return loc
-    return request.accept_languages.best_match(app.config['LANGUAGES'])
+    return negotiator.negotiate(request.headers.get('Accept-Language'))
 
 
 @babel.timezoneselector
 def get_timezone():
     """
     Determines the appropriate timezone for the user.
+    Results are cached per distinct request inputs.
+    """
+    key = ('timezone', request.args.get('timezone'),
+           request.args.get('login_as'))
+    return resolutions.lookup(key, resolve_timezone)
+
+
+def resolve_timezone():
+    """
+    Picks the first valid timezone from the URL or the user, falling
+    back to the default.
     """
     tzone = request.args.get('timezone')
     if tzone:
-        try:
-            return timezone(tzone).zone
-        except pytz.exceptions.UnknownTimeZoneError:
-            pass
+        tzone = zones.lookup(tzone, lambda: zone_name(tzone))
+        if tzone:
+            return tzone
     if g.user:
-        try:
-            tzone = g.user.get('timezone')
-            return timezone(tzone).zone
-        except pytz.exceptions.UnknownTimeZoneError:
-            pass
+        tzone = g.user.get('timezone')
+        tzone = zones.lookup(tzone, lambda: zone_name(tzone))
+        if tzone:
+            return tzone
     return app.config['BABEL_DEFAULT_TIMEZONE']
 
 
 @app.route('/', strict_slashes=False)
-def index() -> str:
+def index() -> Response:
     """
-    Renders the main page.
+    Renders the main page, or answers from the page cache.
     """
-    return render_template('5-index.html')
+    # Everything 5-index.html reads; templates that show g.time must
+    # add it to the key.
+    key = ('5-index.html', str(current_locale()),
+           g.user['name'] if g.user else None, catalogs.poll())
+    return pages.respond(key, lambda: render_template('5-index.html'))
 
 
 if __name__ == "__main__":
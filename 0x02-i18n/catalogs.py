@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Preloaded, hot-reloadable translation catalogs.
+
+Compiled `.mo` files already hold sorted message tables, so a catalog is
+kept as the file's raw bytes plus its table of offsets and searched in
+place; no per-message Python objects are built. With `use_mmap` the
+files are memory-mapped, letting every worker on a host share the same
+pages.
+"""
+import gettext
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Optional, Tuple
+
+MO_MAGIC = 0x950412de
+# Seconds between checks of the .mo files for changes.
+CHECK_INTERVAL = 2.0
+
+
+class MoCatalog:
+    """
+    Read-only lookups in a compiled GNU gettext catalog.
+    """
+
+    def __init__(self, data=b""):
+        """
+        Args:
+            data: The .mo file contents, as bytes or a memory map. Empty
+                or truncated data gives an empty catalog.
+        """
+        self.__data = data
+        self.__originals = array("I")
+        self.__translations = array("I")
+        self.__index: Optional[Dict[bytes, int]] = None
+        self.charset = "utf-8"
+        self.plural: Callable[[int], int] = lambda n: int(n != 1)
+        if len(data) < 20:
+            return
+        (magic,) = struct.unpack("<I", data[:4])
+        order = "<" if magic == MO_MAGIC else ">"
+        magic, revision, count, originals, translations = struct.unpack(
+            order + "5I", data[:20])
+        if magic != MO_MAGIC or revision >> 16 > 1:
+            raise ValueError("Not a GNU .mo catalog.")
+        # (length, offset) pairs of every original and translation.
+        for table, offset in ((self.__originals, originals),
+                              (self.__translations, translations)):
+            table.frombytes(bytes(data[offset:offset + count * 8]))
+            if order != ("<" if sys.byteorder == "little" else ">"):
+                table.byteswap()
+        keys = [self.__key(i) for i in range(count)]
+        if any(keys[i] > keys[i + 1] for i in range(count - 1)):
+            # Producers normally sort messages; fall back to a dict.
+            self.__index = {key: i for i, key in enumerate(keys)}
+        self.__read_header()
+
+    def __len__(self) -> int:
+        return len(self.__originals) // 2
+
+    def __key(self, i: int) -> bytes:
+        # The msgid of entry i, without the plural form after a NUL.
+        length, offset = self.__originals[2 * i], self.__originals[2 * i + 1]
+        return bytes(self.__data[offset:offset + length]).split(b"\0")[0]
+
+    def __translation(self, i: int) -> bytes:
+        length = self.__translations[2 * i]
+        offset = self.__translations[2 * i + 1]
+        return bytes(self.__data[offset:offset + length])
+
+    def __find(self, key: bytes) -> Optional[int]:
+        if self.__index is not None:
+            return self.__index.get(key)
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.__key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self) and self.__key(low) == key:
+            return low
+        return None
+
+    def __read_header(self) -> None:
+        i = self.__find(b"")
+        if i is None:
+            return
+        for line in self.__translation(i).decode("ascii", "replace") \
+                .splitlines():
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            if name == "content-type" and "charset=" in value:
+                self.charset = value.split("charset=")[1].strip()
+            elif name == "plural-forms" and "plural=" in value:
+                self.plural = gettext.c2py(
+                    value.split("plural=")[1].strip().rstrip(";"))
+
+    def gettext(self, message: str) -> str:
+        """
+        Returns the translation of `message`, or `message` itself.
+        """
+        i = self.__find(message.encode(self.charset))
+        if i is None:
+            return message
+        return self.__translation(i).decode(self.charset)
+
+    def ngettext(self, singular: str, plural: str, n: int) -> str:
+        """
+        Returns the plural form of a translation for `n` items.
+        """
+        i = self.__find(singular.encode(self.charset))
+        if i is not None:
+            forms = self.__translation(i).split(b"\0")
+            form = self.plural(n)
+            if form < len(forms):
+                return forms[form].decode(self.charset)
+        return singular if n == 1 else plural
+
+
+def read_catalog(path: str, use_mmap: bool = False) -> MoCatalog:
+    """
+    Loads one .mo file, copied into memory or memory-mapped.
+    """
+    with open(path, "rb") as f:
+        if use_mmap and os.fstat(f.fileno()).st_size:
+            return MoCatalog(mmap.mmap(f.fileno(), 0,
+                                       access=mmap.ACCESS_READ))
+        return MoCatalog(f.read())
+
+
+class CatalogManager:
+    """
+    Loads every `<directory>/<locale>/LC_MESSAGES/<domain>.mo` up front
+    and serves gettext lookups for the current request's locale.
+
+    At most every `interval` seconds a lookup checks the files' sizes and
+    modification times; if anything changed, all catalogs are reloaded
+    and swapped in with one assignment, so requests never see a partly
+    loaded set. With `use_mmap`, catalogs must be replaced by renaming a
+    new file over the old one, never rewritten in place.
+    """
+
+    def __init__(self, directory: str, locale: Callable[[], Optional[str]],
+                 domain: str = "messages", interval: float = CHECK_INTERVAL,
+                 use_mmap: bool = False,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            directory (str): The translations directory.
+            locale (Callable): Returns the locale to translate into, e.g.
+                the current request's `flask_babel.get_locale()`.
+            domain (str): The catalog name.
+            interval (float): Seconds between checks for changed files;
+                None never checks.
+            use_mmap (bool): Memory-map the catalogs instead of copying.
+            clock (Callable): Time source, in seconds.
+        """
+        self.directory = directory
+        self.locale = locale
+        self.domain = domain
+        self.interval = interval
+        self.use_mmap = use_mmap
+        self.clock = clock
+        self.__lock = threading.Lock()
+        self.__catalogs: Dict[str, MoCatalog] = {}
+        self.__stamps: Dict[str, Tuple[int, int]] = {}
+        self.__checked = clock()
+        # Counts reloads, so caches of translated output can tell when
+        # their entries went stale.
+        self.generation = 0
+        self.reload()
+
+    def __scan(self) -> Dict[str, Tuple[int, int]]:
+        # Maps each locale to the (size, mtime) of its catalog file.
+        stamps = {}
+        if not os.path.isdir(self.directory):
+            return stamps
+        for locale in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, locale, "LC_MESSAGES",
+                                self.domain + ".mo")
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stamps[locale] = (stat.st_size, stat.st_mtime_ns)
+        return stamps
+
+    def reload(self) -> None:
+        """
+        Loads every catalog and swaps the whole set in at once.
+        """
+        stamps = self.__scan()
+        catalogs = {}
+        for locale in stamps:
+            path = os.path.join(self.directory, locale, "LC_MESSAGES",
+                                self.domain + ".mo")
+            try:
+                catalogs[locale] = read_catalog(path, self.use_mmap)
+            except (OSError, ValueError, struct.error):
+                # Unreadable or not compiled yet: serve msgids.
+                catalogs[locale] = MoCatalog()
+        self.__catalogs = catalogs
+        self.__stamps = stamps
+        self.generation += 1
+
+    def check(self) -> bool:
+        """
+        Reloads the catalogs if any file changed since the last load.
+
+        Returns:
+            bool: True if the catalogs were reloaded.
+        """
+        with self.__lock:
+            return self.__check()
+
+    def __check(self) -> bool:
+        self.__checked = self.clock()
+        if self.__scan() == self.__stamps:
+            return False
+        self.reload()
+        return True
+
+    def __poll(self) -> None:
+        # One request checks for changes while the others carry on.
+        if self.interval is not None and \
+                self.clock() - self.__checked >= self.interval and \
+                self.__lock.acquire(blocking=False):
+            try:
+                self.__check()
+            finally:
+                self.__lock.release()
+
+    def poll(self) -> int:
+        """
+        Checks for changed files at most every `interval` seconds, as
+        lookups do, and returns the generation.
+
+        Call it before keying a cache of translated output: reading
+        `generation` alone never notices a changed file, since only a
+        lookup during a render would check.
+        """
+        self.__poll()
+        return self.generation
+
+    def catalog(self, locale: Optional[str]) -> MoCatalog:
+        """
+        Returns the catalog for `locale`, falling back to its language
+        ("fr_CA" to "fr"), or an empty catalog.
+        """
+        self.__poll()
+        catalogs = self.__catalogs
+        if locale is not None:
+            locale = str(locale)
+            found = catalogs.get(locale)
+            if found is None:
+                found = catalogs.get(locale.replace("-", "_").split("_")[0])
+            if found is not None:
+                return found
+        return _EMPTY
+
+    @property
+    def locales(self) -> Tuple[str, ...]:
+        """
+        Returns the locales that have a catalog.
+        """
+        return tuple(self.__catalogs)
+
+    def gettext(self, message: str) -> str:
+        """
+        Translates `message` into the current locale.
+        """
+        return self.catalog(self.locale()).gettext(message)
+
+    def ngettext(self, singular: str, plural: str, n: int) -> str:
+        """
+        Translates a message with plural forms into the current locale.
+        """
+        return self.catalog(self.locale()).ngettext(singular, plural, n)
+
+    def install(self, app) -> None:
+        """
+        Makes `app`'s templates translate through this manager.
+        """
+        app.jinja_env.install_gettext_callables(self.gettext, self.ngettext,
+                                                newstyle=True)
+
+
+_EMPTY = MoCatalog()
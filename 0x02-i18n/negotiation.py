@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Accept-Language negotiation against a precompiled table of locales.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from selector_cache import ResolutionCache
+
+# Distinct raw Accept-Language headers remembered.
+HEADER_CACHE_SIZE = 4096
+# Language ranges read from one header; the rest are ignored.
+MAX_RANGES = 32
+
+
+def subtags(tag: str) -> List[str]:
+    """
+    Splits a language tag into lowercase subtags, e.g. "fr_CA" into
+    ["fr", "ca"].
+    """
+    return tag.replace("_", "-").lower().split("-")
+
+
+def parse_header(header: str) -> List[str]:
+    """
+    Returns the language ranges of an Accept-Language header, most
+    preferred first; ranges with q=0 or a malformed q are dropped.
+    """
+    ranges: List[Tuple[float, int, str]] = []
+    for position, item in enumerate(header.split(",")[:MAX_RANGES]):
+        tag, *params = item.split(";")
+        tag = tag.strip()
+        quality = 1.0
+        try:
+            # Any parameter may carry the weight, e.g. "en;level=1;Q = 0.2".
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    quality = float(value)
+        except ValueError:
+            continue
+        if tag and quality > 0:
+            # Equal qualities keep the order of the header.
+            ranges.append((-quality, position, tag))
+    return [tag for _, _, tag in sorted(ranges)]
+
+
+class _Node:
+    __slots__ = ("children", "locale", "first")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # The supported locale spelled exactly by the path to this node,
+        # and the first supported locale anywhere below it.
+        self.locale: Optional[str] = None
+        self.first: Optional[str] = None
+
+
+class Negotiator:
+    """
+    Matches language tags against the supported locales through a trie of
+    their subtags, so a lookup costs O(subtags in the tag) however many
+    locales are supported.
+
+    A tag matches the longest supported prefix ("fr-CA" falls back to
+    "fr"), or else the first supported locale sharing its longest known
+    prefix ("en" or "en-GB" pick "en-US" when only "en-US" is
+    supported). Results per raw header are cached.
+    """
+
+    def __init__(self, locales: Sequence[str],
+                 cache_size: int = HEADER_CACHE_SIZE):
+        """
+        Args:
+            locales (Sequence[str]): Supported locales in order of
+                preference, e.g. `Config.LANGUAGES`.
+            cache_size (int): Number of raw headers to remember.
+        """
+        self.locales = list(locales)
+        self.__supported = frozenset(self.locales)
+        self.__root = _Node()
+        for locale in self.locales:
+            node = self.__root
+            for subtag in subtags(locale):
+                if node.first is None:
+                    node.first = locale
+                node = node.children.setdefault(subtag, _Node())
+            if node.first is None:
+                node.first = locale
+            if node.locale is None:
+                node.locale = locale
+        self.headers = ResolutionCache(cache_size)
+
+    def is_supported(self, locale: Optional[str]) -> bool:
+        """
+        Tells whether `locale` is one of the supported locales verbatim.
+        """
+        return locale in self.__supported
+
+    def match(self, tag: str) -> Optional[str]:
+        """
+        Returns the supported locale best matching a single tag.
+        """
+        if tag == "*":
+            return self.locales[0] if self.locales else None
+        node = self.__root
+        best = None
+        for subtag in subtags(tag):
+            child = node.children.get(subtag)
+            if child is None:
+                break
+            node = child
+            if node.locale is not None:
+                best = node.locale
+        if best is not None or node is self.__root:
+            return best
+        return node.first
+
+    def negotiate(self, header: Optional[str]) -> Optional[str]:
+        """
+        Picks the supported locale for an Accept-Language header, or None
+        if nothing in it is supported.
+        """
+        if not header:
+            return None
+        return self.headers.lookup(header, lambda: self.__negotiate(header))
+
+    def __negotiate(self, header: str) -> Optional[str]:
+        for tag in parse_header(header):
+            locale = self.match(tag)
+            if locale is not None:
+                return locale
+        return None
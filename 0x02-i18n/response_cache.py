@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Output cache for rendered pages, with strong ETags and 304 responses.
+"""
+import hashlib
+from typing import Callable, Dict, Hashable, Tuple
+
+from flask import Response, request
+
+from selector_cache import ResolutionCache
+
+# Distinct rendered pages remembered.
+RESPONSE_CACHE_SIZE = 1024
+# Pages differ per user and language, so shared caches must not store
+# them; browsers keep them but revalidate with If-None-Match every time.
+CACHE_CONTROL = "private, no-cache"
+# Request headers the locale selector reads besides the URL.
+VARY = "Accept-Language, locale"
+
+
+def etag_for(body: bytes) -> str:
+    """
+    Returns the strong entity tag of a response body, unquoted.
+    """
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU of rendered pages and their entity tags.
+
+    A page is cached under a key naming everything it is rendered from,
+    e.g. the template, locale and user. A request whose If-None-Match
+    matches the cached tag gets a 304 without rendering; any other
+    request gets the cached body. Only a miss renders the template.
+    """
+
+    def __init__(self, size: int = RESPONSE_CACHE_SIZE,
+                 cache_control: str = CACHE_CONTROL, vary: str = VARY):
+        """
+        Args:
+            size (int): Number of rendered pages to keep.
+            cache_control (str): The Cache-Control header of every page.
+            vary (str): The Vary header of every page, or None for none.
+        """
+        self.pages = ResolutionCache(size)
+        self.cache_control = cache_control
+        self.vary = vary
+
+    def respond(self, key: Hashable,
+                render: Callable[[], str]) -> Response:
+        """
+        Answers the current request with the page cached under `key`.
+
+        Args:
+            key (Hashable): Every input the page depends on.
+            render (Callable): Renders the page on a cache miss.
+
+        Returns:
+            Response: The page, or an empty 304 if the client's copy is
+                current.
+        """
+        body, tag = self.pages.lookup(key, lambda: self.__render(render))
+        # If-None-Match compares weakly (RFC 7232), so W/"tag" matches too.
+        if request.if_none_match.contains_weak(tag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="text/html")
+        response.set_etag(tag)
+        response.headers["Cache-Control"] = self.cache_control
+        if self.vary:
+            response.headers["Vary"] = self.vary
+        return response
+
+    @staticmethod
+    def __render(render: Callable[[], str]) -> Tuple[bytes, str]:
+        body = render().encode("utf-8")
+        return body, etag_for(body)
+
+    def clear(self) -> None:
+        """
+        Forgets every page, e.g. after templates change.
+        """
+        self.pages.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit counters and current size.
+        """
+        return self.pages.stats()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Memoization for the locale and timezone selectors.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+import pytz
+import pytz.exceptions
+
+T = TypeVar("T")
+
+# Distinct selector inputs remembered.
+RESOLUTION_CACHE_SIZE = 4096
+# Distinct timezone names remembered, valid or not.
+ZONE_CACHE_SIZE = 1024
+
+_MISSING = object()
+
+
+class ResolutionCache:
+    """
+    Thread-safe, size-bounded LRU of resolved values with hit counters.
+
+    None is cached like any other value, so failed resolutions (e.g. an
+    unknown timezone) are remembered too; hits on them are counted as
+    negative hits.
+    """
+
+    def __init__(self, size: int = RESOLUTION_CACHE_SIZE):
+        self.size = size
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def lookup(self, key: Hashable, resolve: Callable[[], T]) -> T:
+        """
+        Returns the cached value for `key`, calling `resolve` on a miss.
+        """
+        with self.__lock:
+            value = self.__entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                if value is None:
+                    self.negative_hits += 1
+                return value
+            self.misses += 1
+        value = resolve()
+        with self.__lock:
+            self.__entries[key] = value
+            if len(self.__entries) > self.size:
+                self.__entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """
+        Forgets every entry, e.g. after user preferences change.
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit counters and current size.
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.__entries),
+            }
+
+
+def zone_name(name: Optional[str]) -> Optional[str]:
+    """
+    Returns the canonical name of a pytz timezone, or None if unknown.
+    """
+    if not name:
+        return None
+    try:
+        return pytz.timezone(name).zone
+    except pytz.exceptions.UnknownTimeZoneError:
+        return None
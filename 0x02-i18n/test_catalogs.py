@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for catalogs.py, checked against the standard gettext module.
+"""
+import gettext
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from catalogs import CatalogManager, MoCatalog, read_catalog
+
+HEADER = ("Content-Type: text/plain; charset=UTF-8\n"
+          "Plural-Forms: nplurals=3; plural=(n==1 ? 0 : n<5 ? 1 : 2);\n")
+MESSAGES = {
+    "": HEADER,
+    "home_title": "Bienvenue à Holberton",
+    "logged_in_as": "Vous êtes connecté en tant que %(username)s.",
+    "zèbre": "zebra",
+    ("apple", "apples"): ("pomme", "pommes", "beaucoup de pommes"),
+}
+
+
+def compile_mo(messages: dict, order: str = "<",
+               sort: bool = True) -> bytes:
+    """
+    Builds a GNU .mo file, like msgfmt.
+    """
+    entries = []
+    for key, value in messages.items():
+        if isinstance(key, tuple):
+            key, value = "\0".join(key), "\0".join(value)
+        entries.append((key.encode("utf-8"), value.encode("utf-8")))
+    if sort:
+        entries.sort()
+    count = len(entries)
+    originals_at = 28
+    translations_at = originals_at + count * 8
+    data_at = translations_at + count * 8
+    blob = io.BytesIO()
+    tables = ([], [])
+    for entry in entries:
+        for table, text in zip(tables, entry):
+            table.append((len(text), data_at + blob.tell()))
+            blob.write(text + b"\0")
+    head = struct.pack(order + "7I", 0x950412de, 0, count, originals_at,
+                       translations_at, 0, 0)
+    body = b"".join(struct.pack(order + "2I", *pair)
+                    for table in tables for pair in table)
+    return head + body + blob.getvalue()
+
+
+class MoCatalogTest(unittest.TestCase):
+    """
+    Lookups match gettext.GNUTranslations on the same file.
+    """
+
+    def assert_like_gettext(self, data: bytes) -> None:
+        catalog = MoCatalog(data)
+        reference = gettext.GNUTranslations(io.BytesIO(data))
+        for message in ("home_title", "logged_in_as", "zèbre", "missing"):
+            self.assertEqual(catalog.gettext(message),
+                             reference.gettext(message))
+        for n in (0, 1, 2, 4, 5, 11):
+            self.assertEqual(catalog.ngettext("apple", "apples", n),
+                             reference.ngettext("apple", "apples", n))
+            self.assertEqual(catalog.ngettext("pear", "pears", n),
+                             reference.ngettext("pear", "pears", n))
+
+    def test_little_endian(self):
+        self.assert_like_gettext(compile_mo(MESSAGES, "<"))
+
+    def test_big_endian(self):
+        self.assert_like_gettext(compile_mo(MESSAGES, ">"))
+
+    def test_unsorted(self):
+        self.assert_like_gettext(compile_mo(MESSAGES, sort=False))
+
+    def test_empty_and_truncated(self):
+        for data in (b"", b"\xde\x12\x04\x95"):
+            catalog = MoCatalog(data)
+            self.assertEqual(len(catalog), 0)
+            self.assertEqual(catalog.gettext("home_title"), "home_title")
+            self.assertEqual(catalog.ngettext("a", "b", 2), "b")
+
+    def test_not_a_catalog(self):
+        with self.assertRaises(ValueError):
+            MoCatalog(b"\0" * 28)
+
+    def test_mmap(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "messages.mo")
+            with open(path, "wb") as f:
+                f.write(compile_mo(MESSAGES))
+            self.assertEqual(read_catalog(path, use_mmap=True).gettext(
+                "home_title"), "Bienvenue à Holberton")
+        finally:
+            shutil.rmtree(directory)
+
+
+class CatalogManagerTest(unittest.TestCase):
+    """
+    Catalogs are picked per locale and reloaded when their files change.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 0.0
+        self.locale = "fr"
+        self.write("fr", MESSAGES)
+        self.write("en", {"home_title": "Welcome to Holberton"})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, locale: str, messages: dict) -> None:
+        folder = os.path.join(self.directory, locale, "LC_MESSAGES")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "messages.mo")
+        with open(path + ".new", "wb") as f:
+            f.write(compile_mo(messages))
+        os.replace(path + ".new", path)
+
+    def manager(self) -> CatalogManager:
+        return CatalogManager(self.directory, lambda: self.locale,
+                              interval=2.0, clock=lambda: self.now)
+
+    def test_locales(self):
+        catalogs = self.manager()
+        self.assertEqual(sorted(catalogs.locales), ["en", "fr"])
+        self.assertEqual(catalogs.gettext("home_title"),
+                         "Bienvenue à Holberton")
+        self.locale = "fr_CA"
+        self.assertEqual(catalogs.gettext("home_title"),
+                         "Bienvenue à Holberton")
+        self.locale = "de"
+        self.assertEqual(catalogs.gettext("home_title"), "home_title")
+        self.locale = None
+        self.assertEqual(catalogs.ngettext("apple", "apples", 3), "apples")
+
+    def test_reload_after_interval(self):
+        catalogs = self.manager()
+        generation = catalogs.generation
+        self.write("fr", {"home_title": "Salut"})
+        os.utime(os.path.join(self.directory, "fr", "LC_MESSAGES",
+                              "messages.mo"), ns=(1, 1))
+        self.now = 1.0
+        self.assertEqual(catalogs.gettext("home_title"),
+                         "Bienvenue à Holberton")
+        self.now = 2.5
+        self.assertEqual(catalogs.gettext("home_title"), "Salut")
+        self.assertEqual(catalogs.generation, generation + 1)
+        self.assertFalse(catalogs.check())
+
+    def test_poll(self):
+        catalogs = self.manager()
+        generation = catalogs.poll()
+        self.write("fr", {"home_title": "Salut"})
+        os.utime(os.path.join(self.directory, "fr", "LC_MESSAGES",
+                              "messages.mo"), ns=(1, 1))
+        self.now = 1.0
+        self.assertEqual(catalogs.poll(), generation)
+        self.now = 2.5
+        self.assertEqual(catalogs.poll(), generation + 1)
+        self.assertEqual(catalogs.gettext("home_title"), "Salut")
+
+    def test_unreadable_catalog(self):
+        self.write("fr", {})
+        with open(os.path.join(self.directory, "fr", "LC_MESSAGES",
+                               "messages.mo"), "wb") as f:
+            f.write(b"\0" * 40)
+        self.assertEqual(self.manager().gettext("home_title"), "home_title")
+
+
+if __name__ == "__main__":
+    unittest.main()
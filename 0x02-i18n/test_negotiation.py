@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for negotiation.py.
+"""
+import unittest
+
+try:
+    from negotiation import Negotiator, parse_header
+except ImportError:  # selector_cache needs pytz.
+    Negotiator = None
+
+
+@unittest.skipIf(Negotiator is None, "pytz is not installed.")
+class ParseHeaderTest(unittest.TestCase):
+    """
+    Language ranges come out by weight, then header order.
+    """
+
+    def test_weights(self):
+        self.assertEqual(parse_header("en;level=1;q=0.2, fr;q=0.5"),
+                         ["fr", "en"])
+        self.assertEqual(parse_header("en;Q=0.5, fr"), ["fr", "en"])
+        self.assertEqual(parse_header("en;q = 0.5 , fr"), ["fr", "en"])
+        self.assertEqual(parse_header("de, en;q=0.9, fr"),
+                         ["de", "fr", "en"])
+
+    def test_dropped_ranges(self):
+        self.assertEqual(parse_header("en;q=0, fr;q=x, , de"), ["de"])
+        self.assertEqual(parse_header(""), [])
+
+
+@unittest.skipIf(Negotiator is None, "pytz is not installed.")
+class NegotiatorTest(unittest.TestCase):
+    """
+    Tags match the longest supported prefix, else a sibling locale.
+    """
+
+    def setUp(self):
+        self.negotiator = Negotiator(["en-US", "fr", "fr-CA"], cache_size=2)
+
+    def test_match(self):
+        match = self.negotiator.match
+        self.assertEqual(match("fr"), "fr")
+        self.assertEqual(match("FR_ca"), "fr-CA")
+        self.assertEqual(match("fr-BE"), "fr")
+        self.assertEqual(match("en"), "en-US")
+        self.assertEqual(match("en-GB"), "en-US")
+        self.assertEqual(match("*"), "en-US")
+        self.assertIsNone(match("de"))
+
+    def test_negotiate(self):
+        negotiate = self.negotiator.negotiate
+        self.assertEqual(negotiate("de, fr-ca;q=0.8, en;q=0.9"), "en-US")
+        self.assertEqual(negotiate("de, fr-ca;q=0.8, en;q=0.9"), "en-US")
+        self.assertIsNone(negotiate("de"))
+        self.assertIsNone(negotiate(None))
+        self.assertEqual(self.negotiator.headers.stats()["hits"], 1)
+
+    def test_is_supported(self):
+        self.assertTrue(self.negotiator.is_supported("fr-CA"))
+        self.assertFalse(self.negotiator.is_supported("fr-ca"))
+        self.assertFalse(self.negotiator.is_supported(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
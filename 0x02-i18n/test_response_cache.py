@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for response_cache.py: strong ETags and 304s without rendering.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from catalogs import CatalogManager
+from test_catalogs import compile_mo
+
+try:
+    from flask import Flask, render_template_string, request
+except ImportError:  # The app needs Flask; so do these tests.
+    Flask = None
+
+if Flask is not None:
+    from response_cache import ResponseCache, etag_for
+
+
+@unittest.skipIf(Flask is None, "Flask is not installed.")
+class ResponseCacheTest(unittest.TestCase):
+    """
+    Pages render once per key and revalidate with If-None-Match.
+    """
+
+    def setUp(self):
+        self.renders = []
+        self.pages = ResponseCache(size=2)
+        app = Flask(__name__)
+
+        @app.route("/")
+        def index():
+            name = request.args.get("name", "")
+            return self.pages.respond(("index", name),
+                                      lambda: self.render(name))
+
+        self.client = app.test_client()
+
+    def render(self, name: str) -> str:
+        self.renders.append(name)
+        return "<p>Bonjour {}</p>".format(name)
+
+    def test_headers(self):
+        response = self.client.get("/?name=Zoë")
+        body = "<p>Bonjour Zoë</p>".encode("utf-8")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, body)
+        self.assertEqual(response.headers["ETag"],
+                         '"{}"'.format(etag_for(body)))
+        self.assertEqual(response.headers["Cache-Control"],
+                         "private, no-cache")
+        self.assertEqual(response.headers["Vary"], "Accept-Language, locale")
+        self.assertEqual(response.mimetype, "text/html")
+
+    def test_not_modified_without_rendering(self):
+        tag = self.client.get("/?name=a").headers["ETag"]
+        for header in (tag, "W/" + tag, '"other", ' + tag, "*"):
+            response = self.client.get("/?name=a",
+                                       headers={"If-None-Match": header})
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response.data, b"")
+            self.assertEqual(response.headers["ETag"], tag)
+        self.assertEqual(self.renders, ["a"])
+
+    def test_mismatch_serves_cached_body(self):
+        first = self.client.get("/?name=a")
+        response = self.client.get("/?name=a",
+                                   headers={"If-None-Match": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, first.data)
+        self.assertEqual(self.renders, ["a"])
+
+    def test_keys_and_eviction(self):
+        tags = {name: self.client.get("/?name=" + name).headers["ETag"]
+                for name in ("a", "b")}
+        self.assertNotEqual(tags["a"], tags["b"])
+        self.client.get("/?name=c")
+        self.client.get("/?name=a")
+        self.assertEqual(self.renders, ["a", "b", "c", "a"])
+        stats = self.pages.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (0, 4))
+        self.assertEqual(stats["entries"], 2)
+        self.pages.clear()
+        response = self.client.get("/?name=a",
+                                   headers={"If-None-Match": tags["a"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.renders, ["a", "b", "c", "a", "a"])
+
+
+@unittest.skipIf(Flask is None, "Flask is not installed.")
+class CatalogReloadTest(unittest.TestCase):
+    """
+    Pages keyed by `CatalogManager.poll()` re-render after a hot reload.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 0.0
+        self.write({"home_title": "Bienvenue"})
+        catalogs = CatalogManager(self.directory, lambda: "fr",
+                                  interval=2.0, clock=lambda: self.now)
+        pages = ResponseCache()
+        app = Flask(__name__)
+        app.jinja_env.add_extension("jinja2.ext.i18n")
+        catalogs.install(app)
+
+        @app.route("/")
+        def index():
+            return pages.respond(("index", catalogs.poll()),
+                                 lambda: render_template_string(
+                                     "<h1>{{ _('home_title') }}</h1>"))
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, messages: dict) -> None:
+        folder = os.path.join(self.directory, "fr", "LC_MESSAGES")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "messages.mo")
+        with open(path, "wb") as f:
+            f.write(compile_mo(messages))
+        os.utime(path, ns=(len(messages), int(self.now * 1e9) + 1))
+
+    def test_reload_invalidates_pages(self):
+        first = self.client.get("/")
+        self.assertEqual(first.data, b"<h1>Bienvenue</h1>")
+        self.write({"home_title": "Salut", "other": "Autre"})
+        self.now = 1.0
+        self.assertEqual(self.client.get("/").data, first.data)
+        self.now = 2.5
+        response = self.client.get(
+            "/", headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b"<h1>Salut</h1>")
+        self.assertNotEqual(response.headers["ETag"], first.headers["ETag"])
+
+
+if __name__ == "__main__":
+    unittest.main()
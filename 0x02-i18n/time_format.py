@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Thread-safe, cached date and time formatting.
+
+Replaces `locale.setlocale` + `strftime`, which changes process-wide
+state on every request, with Babel patterns compiled once per
+(locale, timezone, pattern).
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable
+
+import pytz
+from babel import Locale
+from babel.dates import parse_pattern
+
+# CLDR equivalent of the strftime format "%b %d, %Y %I:%M:%S %p".
+DEFAULT_PATTERN = "MMM dd, yyyy hh:mm:ss a"
+# Distinct (locale, timezone, pattern) formatters kept.
+FORMATTER_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=FORMATTER_CACHE_SIZE)
+def get_formatter(locale: str, tz: str,
+                  pattern: str = DEFAULT_PATTERN) -> Callable[[datetime],
+                                                              str]:
+    """
+    Builds a formatter for one locale, timezone and CLDR pattern.
+
+    Args:
+        locale (str): Locale identifier, e.g. "fr".
+        tz (str): Timezone name, e.g. "Europe/Paris".
+        pattern (str): CLDR date/time pattern.
+
+    Returns:
+        Callable[[datetime], str]: Formats an aware datetime in `tz`.
+    """
+    babel_locale = Locale.parse(locale)
+    zone = pytz.timezone(tz)
+    compiled = parse_pattern(pattern)
+
+    def format_time(moment: datetime) -> str:
+        return compiled.apply(moment.astimezone(zone), babel_locale)
+    return format_time
+
+
+def format_now(locale: str, tz: str, pattern: str = DEFAULT_PATTERN) -> str:
+    """
+    Formats the current time for a locale and timezone.
+    """
+    return get_formatter(locale, tz, pattern)(datetime.now(pytz.utc))